@@ -11,6 +11,7 @@ from osgeo import osr
 from osgeo import ogr
 import pandas
 import rtree
+import scipy.spatial
 import shapely
 import shapely.wkb
 import shapely.ops
@@ -437,18 +438,33 @@ def prepare_landmass_line_index(
         for ext in ['.dat', '.idx']:
             os.remove(target_rtree_base + ext)
 
-    polygon_line_rtree = rtree.index.Index(target_rtree_base)
     shapely_line_index = []
-    line_id = 0
     LOGGER.info("indexing geometry of landmass")
     for line in geometry_to_lines(landmass_shapely):
         if (line.bounds[0] == line.bounds[2] and
                 line.bounds[1] == line.bounds[3]):
             continue
-        polygon_line_rtree.insert(line_id, line.bounds)
-        line_id += 1
         shapely_line_index.append(line)
 
+    # Bulk load the index from a stream rather than inserting one line at a
+    # time; libspatialindex packs a streamed index in a single pass, which is
+    # faster to build and gives a tighter tree for the ray intersections.
+    # An empty stream is an error in libspatialindex, so only stream when
+    # there are lines to index.
+    # The index is never modified after it's built, so pack nodes fuller
+    # than the default fill factor of 0.7; this gives a shallower tree.
+    rtree_properties = rtree.index.Property()
+    rtree_properties.fill_factor = 0.9
+    if shapely_line_index:
+        polygon_line_rtree = rtree.index.Index(
+            target_rtree_base,
+            ((line_id, line.bounds, None)
+             for line_id, line in enumerate(shapely_line_index)),
+            properties=rtree_properties)
+    else:
+        polygon_line_rtree = rtree.index.Index(
+            target_rtree_base, properties=rtree_properties)
+
     with open(target_lines_pickle_path, 'wb') as lines_pickle_file:
         pickle.dump(shapely_line_index, lines_pickle_file)
     polygon_line_rtree.close()
@@ -533,13 +549,19 @@ def interpolate_shore_points(
         layer_name, aoi_spatial_reference, ogr.wkbPoint)
 
     target_defn = target_layer.GetLayerDefn()
+    # SetGeometry copies the geometry, so a single point can be reused, and
+    # a single transaction avoids a geopackage commit per feature.
+    geometry = ogr.Geometry(ogr.wkbPoint)
+    target_layer.StartTransaction()
     for point_feature in point_list:
-        geometry = ogr.Geometry(ogr.wkbPoint)
-        geometry.AddPoint(
-            point_feature.coords[0][0], point_feature.coords[0][1])
+        geometry.SetPoint(
+            0, point_feature.coords[0][0], point_feature.coords[0][1])
         feature = ogr.Feature(target_defn)
         feature.SetGeometry(geometry)
         target_layer.CreateFeature(feature)
+        feature = None
+    target_layer.CommitTransaction()
+    geometry = None
 
     target_layer = None
     target_vector = None
@@ -571,15 +593,25 @@ def interpolate_wwiii_to_shore(
     _max_wwiii_distance = 3.0  # degrees
 
     LOGGER.info("Building spatial index for Wave Watch III points")
-    wwiii_rtree = rtree.index.Index()
     wwiii_vector = gdal.OpenEx(wwiii_vector_path, gdal.OF_VECTOR)
     wwiii_layer = wwiii_vector.GetLayer()
+    wwiii_fid_list = []
+    wwiii_point_list = []
     for wwiii_feature in wwiii_layer:
         wwiii_geometry = wwiii_feature.GetGeometryRef()
-        wwiii_x = wwiii_geometry.GetX()
-        wwiii_y = wwiii_geometry.GetY()
-        wwiii_rtree.insert(
-            wwiii_feature.GetFID(), (wwiii_x, wwiii_y, wwiii_x, wwiii_y))
+        wwiii_fid_list.append(wwiii_feature.GetFID())
+        wwiii_point_list.append(
+            (wwiii_geometry.GetX(), wwiii_geometry.GetY()))
+        wwiii_geometry = None
+        wwiii_feature = None
+    if not wwiii_point_list:
+        raise ValueError(
+            'No WaveWatchIII points were found near the area of interest.'
+            'Is the area of interest far outside the coverage of %s?'
+            % (wwiii_vector_path))
+    # the tree indexes points by their position in `wwiii_fid_list`
+    wwiii_kd_tree = scipy.spatial.cKDTree(numpy.array(wwiii_point_list))
+    n_nearest_wwiii = min(3, len(wwiii_point_list))
 
     # Copy shore point geometry and create fields for WWIII values
     _copy_point_vector_to_gpkg(
@@ -623,30 +655,25 @@ def interpolate_wwiii_to_shore(
             points_to_wwiii_transform.TransformPoint(
                 shore_point_geometry.GetX(), shore_point_geometry.GetY()))
         # From wave watch III points within AOI, get nearest from shore point
-        nearest_points = list(wwiii_rtree.nearest(
-            (shore_point_longitude, shore_point_latitude,
-             shore_point_longitude, shore_point_latitude), 3))[0:3]
-
-        # create placeholders for point geometry and field values
-        wwiii_points = numpy.empty((3, 2))
-        wwiii_values = numpy.empty((3, len(field_names)))
-        for fid_index, fid in enumerate(nearest_points):
-            wwiii_feature = wwiii_layer.GetFeature(fid)
-            wwiii_geometry = wwiii_feature.GetGeometryRef()
-            wwiii_points[fid_index] = numpy.array(
-                [wwiii_geometry.GetX(), wwiii_geometry.GetY()])
+        distances, nearest_indexes = wwiii_kd_tree.query(
+            (shore_point_longitude, shore_point_latitude), k=n_nearest_wwiii)
+        # a query for a single neighbor returns scalars
+        distances = numpy.atleast_1d(distances)
+        nearest_indexes = numpy.atleast_1d(nearest_indexes)
+
+        # create placeholder for field values
+        wwiii_values = numpy.empty((n_nearest_wwiii, len(field_names)))
+        for point_index, wwiii_index in enumerate(nearest_indexes):
+            fid = wwiii_fid_list[wwiii_index]
             try:
-                wwiii_values[fid_index] = wwiii_field_lookup[fid]
+                wwiii_values[point_index] = wwiii_field_lookup[fid]
             except KeyError:
+                wwiii_feature = wwiii_layer.GetFeature(fid)
                 wwiii_field_lookup[fid] = numpy.array(
                     [float(wwiii_feature.GetField(field_name))
                      for field_name in field_names])
-                wwiii_values[fid_index] = wwiii_field_lookup[fid]
-
-        distances = numpy.linalg.norm(
-            wwiii_points - numpy.array(
-                (shore_point_longitude,
-                 shore_point_latitude)), axis=1)
+                wwiii_values[point_index] = wwiii_field_lookup[fid]
+                wwiii_feature = None
 
         # make sure points are within a valid data distance
         close_enough = distances < _max_wwiii_distance
@@ -710,52 +737,68 @@ def interpolate_sealevelrise_points(
     transform_slr_to_shore = osr.CoordinateTransformation(
         base_spatial_reference, target_spatial_reference)
 
-    slr_rtree = rtree.index.Index()
     slr_vector = gdal.OpenEx(
         slr_points_vector_path, gdal.OF_VECTOR | gdal.GA_ReadOnly)
     slr_layer = slr_vector.GetLayer()
+    slr_fid_list = []
+    slr_point_list = []
     for feature in slr_layer:
         geometry = feature.GetGeometryRef()
         geometry.Transform(transform_slr_to_shore)
-        slr_x = geometry.GetX()
-        slr_y = geometry.GetY()
-        slr_rtree.insert(
-            feature.GetFID(), (slr_x, slr_y, slr_x, slr_y))
+        slr_fid_list.append(feature.GetFID())
+        slr_point_list.append((geometry.GetX(), geometry.GetY()))
         geometry = None
         feature = None
+    # the tree indexes points by their position in `slr_fid_list`
+    if slr_point_list:
+        slr_kd_tree = scipy.spatial.cKDTree(numpy.array(slr_point_list))
+    n_nearest_slr = min(2, len(slr_point_list))
 
-    result = {}
     base_vector = gdal.OpenEx(
         base_shore_point_vector_path, gdal.OF_VECTOR | gdal.GA_ReadOnly)
     base_layer = base_vector.GetLayer()
+    shore_fid_list = []
+    shore_point_list = []
     for feature in base_layer:
-        shore_fid = feature.GetFID()
         shore_geometry = feature.GetGeometryRef()
-        shore_x = shore_geometry.GetX()
-        shore_y = shore_geometry.GetY()
-        nearest_points = list(slr_rtree.nearest(
-            (shore_x, shore_y, shore_x, shore_y), 2))[0:2]
-
-        nearest_slr_values = numpy.empty((len(nearest_points), 1))
-        # nearest_slr_values = numpy.empty((2, 1))
-        slr_points = numpy.empty((len(nearest_points), 2))
-        for fid_index, fid in enumerate(nearest_points):
-            slr_feature = slr_layer.GetFeature(fid)
-            slr_geometry = slr_feature.GetGeometryRef()
-            slr_geometry.Transform(transform_slr_to_shore)
-            slr_points[fid_index] = numpy.array(
-                [slr_geometry.GetX(), slr_geometry.GetY()])
+        shore_fid_list.append(feature.GetFID())
+        shore_point_list.append((shore_geometry.GetX(), shore_geometry.GetY()))
+        shore_geometry = None
+        feature = None
+    base_layer = None
+    base_vector = None
+
+    n_shore_points = len(shore_fid_list)
+    if n_nearest_slr > 0 and n_shore_points > 0:
+        # query every shore point at once; reshape because a query for a
+        # single neighbor drops the neighbor axis.
+        distance_array, nearest_index_array = slr_kd_tree.query(
+            numpy.array(shore_point_list), k=n_nearest_slr)
+        distance_array = distance_array.reshape(
+            (n_shore_points, n_nearest_slr))
+        nearest_index_array = nearest_index_array.reshape(
+            (n_shore_points, n_nearest_slr))
+    else:
+        # with no sea-level rise points, no shore point has a neighbor
+        distance_array = numpy.empty((n_shore_points, 0))
+        nearest_index_array = numpy.empty((n_shore_points, 0), dtype=int)
+
+    result = {}
+    for shore_index, shore_fid in enumerate(shore_fid_list):
+        distances = distance_array[shore_index]
+        nearest_indexes = nearest_index_array[shore_index]
+
+        nearest_slr_values = numpy.empty((n_nearest_slr, 1))
+        for point_index, slr_index in enumerate(nearest_indexes):
+            slr_feature = slr_layer.GetFeature(slr_fid_list[slr_index])
             try:
-                nearest_slr_values[fid_index] = float(
+                nearest_slr_values[point_index] = float(
                     slr_feature.GetField(slr_fieldname))
             except KeyError:
                 raise KeyError(
                     'fieldname %s not found in %s' % (
                         slr_fieldname, slr_points_vector_path))
-
-        distances = numpy.linalg.norm(
-            slr_points - numpy.array(
-                (shore_x, shore_y)), axis=1)
+            slr_feature = None
 
         # make sure points are within a valid data distance
         close_enough = distances < max_slr_distance
@@ -771,8 +814,6 @@ def interpolate_sealevelrise_points(
 
     slr_layer = None
     slr_vector = None
-    base_layer = None
-    base_vector = None
 
     with open(target_pickle_path, 'wb') as pickle_file:
         pickle.dump(result, pickle_file)
@@ -1565,7 +1606,8 @@ def assemble_results_and_calculate_exposure(
     # Copy precalculated R_hab to the output vector
     habitat_dataframe = pandas.read_csv(habitat_protection_path)
     for feature_id, rank in zip(
-            habitat_dataframe['fid'], habitat_dataframe[R_hab_name]):
+            habitat_dataframe['fid'].tolist(),
+            habitat_dataframe[R_hab_name].tolist()):
         feature = output_layer.GetFeature(int(feature_id))
         feature.SetField(str(R_hab_name), float(rank))
         output_layer.SetFeature(feature)
@@ -1729,9 +1771,9 @@ def _bin_values_to_percentiles(base_values_dict, invert_values=False):
     rank_array[rank_array > len(percentiles)] = numpy.nan
 
     fids = base_values_dict.keys()
-    target_values_dict = {}
-    for fid, rank in zip(fids, rank_array):
-        target_values_dict[fid] = rank
+    # tolist converts the ranks in one pass rather than boxing a numpy
+    # scalar on every iteration
+    target_values_dict = dict(zip(fids, rank_array.tolist()))
     return target_values_dict
 
 
@@ -1754,8 +1796,8 @@ def clip_and_project_raster(
         None
 
     """
-    base_srs_wkt = pygeoprocessing.get_raster_info(
-        base_raster_path)['projection']
+    base_raster_info = pygeoprocessing.get_raster_info(base_raster_path)
+    base_srs_wkt = base_raster_info['projection']
 
     # 'base' and 'target' srs are with respect to the base and target raster,
     # so first the clipping box needs to go from 'target' to 'base' srs
@@ -1768,8 +1810,7 @@ def clip_and_project_raster(
             os.path.splitext(
                 base_raster_path)[0]) + '_clipped%s.tif' % file_suffix)
 
-    base_pixel_size = pygeoprocessing.get_raster_info(
-        base_raster_path)['pixel_size']
+    base_pixel_size = base_raster_info['pixel_size']
     target_pixel_size = (model_resolution, model_resolution * -1)
 
     # Clip in the raster's native srs
@@ -1923,8 +1964,7 @@ def _aggregate_raster_values_in_radius(
     top_half = numpy.flip(bottom_half[1:, :], axis=0)
     kernel_index_distances = numpy.concatenate((top_half, bottom_half), axis=0)
 
-    kernel_mask = numpy.where(
-        kernel_index_distances > pixel_dist, False, True)
+    kernel_mask = kernel_index_distances <= pixel_dist
 
     result = {}
     vector = gdal.OpenEx(
@@ -4,10 +4,13 @@ An implementation of the model described in 'Degradation in carbon stocks
 near tropical forest edges', by Chaplin-Kramer et. al (2015).
 """
 from __future__ import absolute_import
+import collections
+import itertools
+import multiprocessing
+import multiprocessing.pool
 import os
 import logging
 import time
-import uuid
 
 import pickle
 import numpy
@@ -25,6 +28,11 @@ LOGGER = logging.getLogger('natcap.invest.carbon_edge_effect')
 # grid cells are 100km. Becky says 500km is a good upper bound to search
 DISTANCE_UPPER_BOUND = 500e3
 
+# blocks whose diagonal is shorter than this (in meters) are small enough
+# relative to the model grid that all their pixels share the nearest model
+# points found at the block center
+BLOCK_QUERY_MAX_DIAGONAL = 10e3
+
 # helpful to have a global nodata defined for all the carbon map rasters
 CARBON_MAP_NODATA = -9999
 
@@ -192,10 +200,11 @@ def execute(args):
     # Map non-forest landcover codes to carbon biomasses
     LOGGER.info('Calculating direct mapped carbon stocks')
     carbon_maps = []
+    carbon_map_task_list = []
     biophysical_table = utils.build_lookup_from_csv(
         args['biophysical_table_path'], 'lucode', to_lower=False)
     biophysical_keys = [
-        x.lower() for x in biophysical_table.itervalues().next().keys()]
+        x.lower() for x in next(iter(biophysical_table.values())).keys()]
     pool_list = [('c_above', True)]
     if args['pools_to_calculate'] == 'all':
         pool_list.extend([
@@ -204,13 +213,13 @@ def execute(args):
         if carbon_pool_type in biophysical_keys:
             carbon_maps.append(
                 output_file_registry[carbon_pool_type+'_map'])
-            task_graph.add_task(
+            carbon_map_task_list.append(task_graph.add_task(
                 func=_calculate_lulc_carbon_map,
                 args=(args['lulc_raster_path'], args['biophysical_table_path'],
                       carbon_pool_type, ignore_tropical_type,
                       args['compute_forest_edge_effects'], carbon_maps[-1]),
                 target_path_list=[carbon_maps[-1]],
-                task_name='calculate_lulc_%s_map' % carbon_pool_type)
+                task_name='calculate_lulc_%s_map' % carbon_pool_type))
 
     if args['compute_forest_edge_effects']:
         # generate a map of pixel distance to forest edge from the landcover map
@@ -224,7 +233,9 @@ def execute(args):
                               output_file_registry['non_forest_mask']],
             task_name='map_distance_from_forest_edge')
 
-        # Build spatial index for gridded global model for closest 3 points
+        # Build spatial index for gridded global model for closest 3 points.
+        # This only needs the landcover projection so it doesn't depend on
+        # the distance transform and the two can run concurrently.
         LOGGER.info('Building spatial index for forest edge models.')
         build_spatial_index_task = task_graph.add_task(
             func=_build_spatial_index,
@@ -236,17 +247,19 @@ def execute(args):
 
         # calculate the carbon edge effect on forests
         LOGGER.info('Calculating forest edge carbon')
-        task_graph.add_task(
+        carbon_map_task_list.append(task_graph.add_task(
             func=_calculate_tropical_forest_edge_carbon_map,
             args=(output_file_registry['edge_distance'],
+                  output_file_registry['non_forest_mask'],
                   output_file_registry['spatial_index_pickle'],
                   int(args['n_nearest_model_points']),
                   float(args['biomass_to_carbon_conversion_factor']),
-                  output_file_registry['tropical_forest_edge_carbon_map']),
+                  output_file_registry['tropical_forest_edge_carbon_map'],
+                  n_workers),
             target_path_list=[
                 output_file_registry['tropical_forest_edge_carbon_map']],
             task_name='calculate_forest_edge_carbon_map',
-            dependent_task_list=[map_distance_task, build_spatial_index_task])
+            dependent_task_list=[map_distance_task, build_spatial_index_task]))
 
         # This is also a carbon stock
         carbon_maps.append(
@@ -257,17 +270,16 @@ def execute(args):
 
     carbon_maps_band_list = [(path, 1) for path in carbon_maps]
 
-    # Join here since the raster calculation depends on the target datasets
-    # from all the tasks above
-    task_graph.join()
-
+    # depend on the carbon map tasks rather than joining here so the whole
+    # graph is scheduled up front and independent tasks can overlap
     combine_carbon_maps_task = task_graph.add_task(
         func=pygeoprocessing.raster_calculator,
         args=(carbon_maps_band_list, combine_carbon_maps,
               output_file_registry['carbon_map'], gdal.GDT_Float32,
               CARBON_MAP_NODATA),
         target_path_list=[output_file_registry['carbon_map']],
-        task_name='combine_carbon_maps')
+        task_name='combine_carbon_maps',
+        dependent_task_list=carbon_map_task_list)
 
     # generate report (optional) by aoi if they exist
     if 'aoi_vector_path' in args and args['aoi_vector_path'] != '':
@@ -297,13 +309,14 @@ def combine_carbon_maps(*carbon_maps):
             different pool types.
 
     """
-    result = numpy.zeros(carbon_maps[0].shape)
-    nodata_mask = numpy.empty(carbon_maps[0].shape, dtype=numpy.bool)
-    nodata_mask[:] = True
+    result = numpy.zeros(carbon_maps[0].shape, dtype=numpy.float32)
+    nodata_mask = numpy.ones(carbon_maps[0].shape, dtype=numpy.bool)
     for carbon_map in carbon_maps:
         valid_mask = carbon_map != CARBON_MAP_NODATA
         nodata_mask &= ~valid_mask
-        result[valid_mask] += carbon_map[valid_mask]
+        # accumulate in place rather than gathering and scattering the
+        # valid pixels through a boolean index
+        numpy.add(result, carbon_map, out=result, where=valid_mask)
     result[nodata_mask] = CARBON_MAP_NODATA
     return result
 
@@ -337,30 +350,17 @@ def _aggregate_carbon_map(
     target_aggregate_vector = driver.CreateCopy(
         target_aggregate_vector_path, aoi_vector)
     aoi_vector = None
-    target_aggregate_layer = target_aggregate_vector.GetLayer()
-
-    # make an identifying id per polygon that can be used for aggregation
-    while True:
-        serviceshed_defn = target_aggregate_layer.GetLayerDefn()
-        poly_id_field = str(uuid.uuid4())[-8:]
-        if serviceshed_defn.GetFieldIndex(poly_id_field) == -1:
-            break
-    layer_id_field = ogr.FieldDefn(poly_id_field, ogr.OFTInteger)
-    target_aggregate_layer.CreateField(layer_id_field)
-    target_aggregate_layer.StartTransaction()
-    for poly_index, poly_feat in enumerate(target_aggregate_layer):
-        poly_feat.SetField(poly_id_field, poly_index)
-        target_aggregate_layer.SetFeature(poly_feat)
-    target_aggregate_layer.CommitTransaction()
-    target_aggregate_layer.SyncToDisk()
+    target_aggregate_vector = None
 
-    # aggregate carbon stocks by the new ID field
+    # aggregate carbon stocks by feature, the stats are keyed by FID so no
+    # temporary id field is needed and every feature only needs to be
+    # written once with its results below
     serviceshed_stats = pygeoprocessing.zonal_statistics(
         (carbon_map_path, 1), target_aggregate_vector_path)
 
-    # don't need a random poly id anymore
-    target_aggregate_layer.DeleteField(
-        serviceshed_defn.GetFieldIndex(poly_id_field))
+    target_aggregate_vector = gdal.OpenEx(
+        target_aggregate_vector_path, gdal.OF_VECTOR | gdal.GA_Update)
+    target_aggregate_layer = target_aggregate_vector.GetLayer()
 
     carbon_sum_field = ogr.FieldDefn('c_sum', ogr.OFTReal)
     carbon_sum_field.SetWidth(24)
@@ -374,7 +374,6 @@ def _aggregate_carbon_map(
 
     target_aggregate_layer.ResetReading()
     target_aggregate_layer.StartTransaction()
-
     for poly_feat in target_aggregate_layer:
         poly_fid = poly_feat.GetFID()
         poly_feat.SetField(
@@ -388,6 +387,7 @@ def _aggregate_carbon_map(
 
         target_aggregate_layer.SetFeature(poly_feat)
     target_aggregate_layer.CommitTransaction()
+    target_aggregate_layer.SyncToDisk()
 
 
 def _calculate_lulc_carbon_map(
@@ -482,9 +482,17 @@ def _map_distance_from_tropical_forest_edge(
     # Build a list of forest lucodes
     biophysical_table = utils.build_lookup_from_csv(
         biophysical_table_path, 'lucode', to_lower=False)
-    forest_codes = [
-        lucode for (lucode, ludata) in biophysical_table.iteritems()
-        if int(ludata['is_tropical_forest']) == 1]
+    forest_codes = numpy.array([
+        int(lucode) for (lucode, ludata) in biophysical_table.items()
+        if int(ludata['is_tropical_forest']) == 1], dtype=numpy.int64)
+
+    # lookup table indexed by (lucode - min_forest_code) that's True where
+    # the landcover code is a forest type
+    min_forest_code = forest_codes.min() if forest_codes.size > 0 else 0
+    max_forest_code = forest_codes.max() if forest_codes.size > 0 else 0
+    is_forest_lookup = numpy.zeros(
+        max_forest_code - min_forest_code + 1, dtype=numpy.bool)
+    is_forest_lookup[forest_codes - min_forest_code] = True
 
     # Make a raster where 1 is non-forest landcover types and 0 is forest
     forest_mask_nodata = 255
@@ -493,8 +501,13 @@ def _map_distance_from_tropical_forest_edge(
 
     def mask_non_forest_op(lulc_array):
         """converts forest lulc codes to 1"""
-        non_forest_mask = ~numpy.in1d(
-            lulc_array.flatten(), forest_codes).reshape(lulc_array.shape)
+        lookup_index = lulc_array.astype(numpy.int64) - min_forest_code
+        # codes outside the lookup table's range can't be forest
+        in_lookup_mask = (
+            (lookup_index >= 0) & (lookup_index < is_forest_lookup.size))
+        non_forest_mask = numpy.ones(lulc_array.shape, dtype=numpy.uint8)
+        non_forest_mask[in_lookup_mask] = ~is_forest_lookup[
+            lookup_index[in_lookup_mask]]
         nodata_mask = lulc_array == lulc_nodata
         return numpy.where(nodata_mask, forest_mask_nodata, non_forest_mask)
 
@@ -529,7 +542,8 @@ def _build_spatial_index(
             tuple of:
                 scipy.spatial.cKDTree (georeferenced locally projected model
                     points)
-                theta_model_parameters (parallel Nx3 array of theta parameters)
+                theta_model_parameters (tuple of 3 parallel N arrays of the
+                    theta1, theta2 and theta3 parameters)
                 method_model_parameter (parallel N array of model numbers (1..3))
 
     Returns:
@@ -550,7 +564,8 @@ def _build_spatial_index(
     model_layer = model_vector.GetLayer()
 
     kd_points = []
-    theta_model_parameters = []
+    # one list per theta so each is stored as its own contiguous array
+    theta_model_parameters = ([], [], [])
     method_model_parameter = []
 
     # put all the polygons in the kd_tree because it's fast and simple
@@ -560,18 +575,22 @@ def _build_spatial_index(
         # put in row/col order since rasters are row/col indexed
         kd_points.append([poly_centroid.GetY(), poly_centroid.GetX()])
 
-        theta_model_parameters.append([
-            poly_feature.GetField(feature_id) for feature_id in
-            ['theta1', 'theta2', 'theta3']])
+        for theta_list, feature_id in zip(
+                theta_model_parameters, ['theta1', 'theta2', 'theta3']):
+            theta_list.append(poly_feature.GetField(feature_id))
         method_model_parameter.append(poly_feature.GetField('method'))
 
     method_model_parameter = numpy.array(
         method_model_parameter, dtype=numpy.int32)
-    theta_model_parameters = numpy.array(
-        theta_model_parameters, dtype=numpy.float32)
+    theta_model_parameters = tuple(
+        numpy.array(theta_list, dtype=numpy.float32)
+        for theta_list in theta_model_parameters)
 
     LOGGER.info('Building kd_tree')
-    kd_tree = scipy.spatial.cKDTree(kd_points)
+    # the tree is queried in large batches with a small k, a balanced and
+    # compact tree with bigger leaves is faster for that than the defaults
+    kd_tree = scipy.spatial.cKDTree(
+        kd_points, leafsize=32, compact_nodes=True, balanced_tree=True)
     LOGGER.info('Done building kd_tree with %d points', len(kd_points))
 
     with open(target_spatial_index_pickle_path, 'wb') as picklefile:
@@ -581,23 +600,29 @@ def _build_spatial_index(
 
 
 def _calculate_tropical_forest_edge_carbon_map(
-        edge_distance_path, spatial_index_pickle_path, n_nearest_model_points,
-        biomass_to_carbon_conversion_factor,
-        tropical_forest_edge_carbon_map_path):
+        edge_distance_path, non_forest_mask_path, spatial_index_pickle_path,
+        n_nearest_model_points, biomass_to_carbon_conversion_factor,
+        tropical_forest_edge_carbon_map_path, n_workers):
     """Calculates the carbon on the forest pixels accounting for their global
     position with respect to precalculated edge carbon models.
 
     Parameters:
         edge_distance_path (string): path to the a raster where each pixel
-            contains the pixel distance to forest edge.
+            contains the distance to forest edge in pixels. These are
+            converted to kilometers by the mean pixel size since the carbon
+            edge models expect edge distances in km.
+        non_forest_mask_path (string): path to a raster aligned with
+            ``edge_distance_path`` that is 0 on forest pixels, 1 on non-forest
+            pixels and 255 on nodata. Only forest pixels are calculated.
         spatial_index_pickle_path (string): path to the pickle file that
             contains a tuple of:
                 kd_tree (scipy.spatial.cKDTree): a kd-tree that has indexed the
                     valid model parameter points for fast nearest neighbor
                     calculations.
-                theta_model_parameters (numpy.array Nx3): parallel array of
-                    model theta parameters consistent with the order in which
-                    points were inserted into 'kd_tree'
+                theta_model_parameters (tuple): 3 parallel numpy.arrays of
+                    the model theta1, theta2 and theta3 parameters
+                    consistent with the order in which points were inserted
+                    into 'kd_tree'
                 method_model_parameter (numpy.array N): parallel array of
                     method numbers (1..3) consistent with the order in which
                     points were inserted into 'kd_tree'.
@@ -608,6 +633,10 @@ def _calculate_tropical_forest_edge_carbon_map(
         tropical_forest_edge_carbon_map_path (string): a filepath to the output
             raster which will contain total carbon stocks per cell of forest
             type.
+        n_workers (int): the model's ``n_workers`` taskgraph setting. When
+            positive, up to this many tasks may run at once, so only this
+            many threads are used to calculate blocks. Otherwise this is the
+            only task running and a thread per CPU is used.
 
     Returns:
         None
@@ -615,8 +644,9 @@ def _calculate_tropical_forest_edge_carbon_map(
     """
 
     # load spatial indeces from pickle file
-    kd_tree, theta_model_parameters, method_model_parameter = pickle.load(
-        open(spatial_index_pickle_path, 'rb'))
+    with open(spatial_index_pickle_path, 'rb') as picklefile:
+        kd_tree, theta_model_parameters, method_model_parameter = (
+            pickle.load(picklefile))
 
     # create output raster and open band for writing
     # fill nodata, in case we skip entire memory blocks that are non-forest
@@ -629,6 +659,11 @@ def _calculate_tropical_forest_edge_carbon_map(
     edge_carbon_band = edge_carbon_raster.GetRasterBand(1)
     edge_carbon_geotransform = edge_carbon_raster.GetGeoTransform()
 
+    # the byte forest mask is read alongside the edge distance blocks to pick
+    # out the forest pixels rather than testing the float edge distances
+    non_forest_mask_raster = gdal.OpenEx(non_forest_mask_path, gdal.OF_RASTER)
+    non_forest_mask_band = non_forest_mask_raster.GetRasterBand(1)
+
     # create edge distance band for memory block reading
     n_rows = edge_carbon_raster.RasterYSize
     n_cols = edge_carbon_raster.RasterXSize
@@ -642,132 +677,323 @@ def _calculate_tropical_forest_edge_carbon_map(
     cell_size_km = (abs(cell_xsize) + abs(cell_ysize))/2 / 1000.0
     cell_area_ha = (abs(cell_xsize) * abs(cell_ysize)) / 10000.0
 
-    # Loop memory block by memory block, calculating the forest edge carbon
-    # for every forest pixel.
-    for edge_distance_data, edge_distance_block in pygeoprocessing.iterblocks(
-            (edge_distance_path, 1), largest_block=2**12):
-        current_time = time.time()
-        if current_time - last_time > 5.0:
-            LOGGER.info(
-                'Carbon edge calculation approx. %.2f%% complete',
-                (n_cells_processed / float(n_cells) * 100.0))
-            last_time = current_time
-        n_cells_processed += (
-            edge_distance_data['win_xsize'] * edge_distance_data['win_ysize'])
-        valid_edge_distance_mask = (edge_distance_block > 0)
-
-        # if no valid forest pixels to calculate, skip to the next block
-        if not valid_edge_distance_mask.any():
-            continue
-
-        # calculate local coordinates for each pixel so we can test for
-        # distance to the nearest carbon model points
-        col_range = numpy.linspace(
-            edge_carbon_geotransform[0] +
-            edge_carbon_geotransform[1] * edge_distance_data['xoff'],
-            edge_carbon_geotransform[0] +
-            edge_carbon_geotransform[1] * (
-                edge_distance_data['xoff'] + edge_distance_data['win_xsize']),
-            num=edge_distance_data['win_xsize'], endpoint=False)
-        row_range = numpy.linspace(
-            edge_carbon_geotransform[3] +
-            edge_carbon_geotransform[5] * edge_distance_data['yoff'],
-            edge_carbon_geotransform[3] +
+    # maps a tuple of nearest model point indexes to their gathered model
+    # parameters for blocks that share a single nearest point query
+    model_parameter_cache = {}
+
+    def edge_carbon_block_op(
+            edge_distance_data, edge_distance_block, non_forest_mask_block):
+        """Calculate the forest edge carbon of a block's forest pixels.
+
+        Parameters:
+            edge_distance_data (dict): the block's offset and size as
+                returned by ``pygeoprocessing.iterblocks``.
+            edge_distance_block (numpy.ndarray): the block's edge distances.
+            non_forest_mask_block (numpy.ndarray): the block's non forest
+                mask values, 0 where the pixel is forest.
+
+        Returns:
+            tuple of (row_index, col_index, carbon) arrays of the block
+            indexes and carbon stocks of the block's forest pixels.
+
+        """
+        # row/col indexes of the valid forest pixels are used to compute
+        # their coordinates and to scatter the results back into the block
+        row_index, col_index = numpy.nonzero(non_forest_mask_block == 0)
+
+        # if no valid forest pixels to calculate, there's nothing to do
+        if row_index.size == 0:
+            return row_index, col_index, None
+
+        # calculate local coordinates for just the valid pixels so we can
+        # test for distance to the nearest carbon model points
+        row_coords = edge_carbon_geotransform[3] + (
             edge_carbon_geotransform[5] * (
-                edge_distance_data['yoff'] + edge_distance_data['win_ysize']),
-            num=edge_distance_data['win_ysize'], endpoint=False)
-        col_coords, row_coords = numpy.meshgrid(col_range, row_range)
-
-        # query nearest points for every point in the grid
-        # n_jobs=-1 means use all available CPUs
-        coord_points = zip(
-            row_coords[valid_edge_distance_mask].ravel(),
-            col_coords[valid_edge_distance_mask].ravel())
-        # note, the 'n_jobs' parameter was introduced in SciPy 0.16.0
-        distances, indexes = kd_tree.query(
-            coord_points, k=n_nearest_model_points,
-            distance_upper_bound=DISTANCE_UPPER_BOUND, n_jobs=-1)
-
-        if n_nearest_model_points == 1:
-            distances = distances.reshape(distances.shape[0], 1)
-            indexes = indexes.reshape(indexes.shape[0], 1)
-
-        # the 3 is for the 3 thetas in the carbon model
-        thetas = numpy.zeros((indexes.shape[0], indexes.shape[1], 3))
-        valid_index_mask = (indexes != kd_tree.n)
-        thetas[valid_index_mask] = theta_model_parameters[
-            indexes[valid_index_mask]]
-
-        # the 3 is for the 3 models (asym, exp, linear)
-        biomass_model = numpy.zeros(
-            (indexes.shape[0], indexes.shape[1], 3))
-        # reshape to an N,nearest_points so we can multiply by thetas
-        valid_edge_distances_km = numpy.repeat(
-            edge_distance_block[valid_edge_distance_mask] * cell_size_km,
-            n_nearest_model_points).reshape(-1, n_nearest_model_points)
-
-        # asymptotic model
-        # biomass_1 = t1 - t2 * exp(-t3 * edge_dist_km)
-        biomass_model[:, :, 0] = (
-            thetas[:, :, 0] - thetas[:, :, 1] * numpy.exp(
-                -thetas[:, :, 2] * valid_edge_distances_km)
-            ) * cell_area_ha
-
-        # logarithmic model
-        # biomass_2 = t1 + t2 * numpy.log(edge_dist_km)
-        biomass_model[:, :, 1] = (
-            thetas[:, :, 0] + thetas[:, :, 1] * numpy.log(
-                valid_edge_distances_km)) * cell_area_ha
-
-        # linear regression
-        # biomass_3 = t1 + t2 * edge_dist_km
-        biomass_model[:, :, 2] = (
-            (thetas[:, :, 0] + thetas[:, :, 1] * valid_edge_distances_km) *
-            cell_area_ha)
-
-        # Collapse the biomass down to the valid models
-        model_index = numpy.zeros(indexes.shape, dtype=numpy.int8)
-        model_index[valid_index_mask] = (
-            method_model_parameter[indexes[valid_index_mask]] - 1)
-
-        # reduce the axis=1 dimensionality of the model by selecting the
-        # appropriate value via the model_index array. Got this trick from
-        # http://stackoverflow.com/questions/18702746/reduce-a-dimension-of-numpy-array-by-selecting
-        biomass_y, biomass_x = numpy.meshgrid(
-            numpy.arange(biomass_model.shape[1]),
-            numpy.arange(biomass_model.shape[0]))
-        biomass = biomass_model[biomass_x, biomass_y, model_index]
-
-        # reshape the array so that each set of points is in a separate
-        # dimension, here distances are distances to each valid model
-        # point, not distance to edge of forest
-        weights = numpy.zeros(distances.shape)
-        valid_distance_mask = (distances > 0) & (distances < numpy.inf)
-        weights[valid_distance_mask] = (
-            n_nearest_model_points / distances[valid_distance_mask])
-
-        # Denominator is the sum of the weights per nearest point (axis 1)
-        denom = numpy.sum(weights, axis=1)
-        # To avoid a divide by 0
-        valid_denom = denom != 0
-        average_biomass = numpy.zeros(distances.shape[0])
-        average_biomass[valid_denom] = (
-            numpy.sum(weights[valid_denom] *
-                      biomass[valid_denom], axis=1) / denom[valid_denom])
-
-        # Ensure the result has nodata everywhere the distance was invalid
-        result = numpy.empty(
-            edge_distance_block.shape, dtype=numpy.float32)
-        result[:] = CARBON_MAP_NODATA
-        # convert biomass to carbon in this stage
-        result[valid_edge_distance_mask] = (
-            average_biomass * biomass_to_carbon_conversion_factor)
-        edge_carbon_band.WriteArray(
-            result, xoff=edge_distance_data['xoff'],
-            yoff=edge_distance_data['yoff'])
+                edge_distance_data['yoff'] + row_index))
+        col_coords = edge_carbon_geotransform[0] + (
+            edge_carbon_geotransform[1] * (
+                edge_distance_data['xoff'] + col_index))
+
+        block_diagonal = numpy.hypot(
+            edge_distance_data['win_xsize'] * edge_carbon_geotransform[1],
+            edge_distance_data['win_ysize'] * edge_carbon_geotransform[5])
+        if block_diagonal <= BLOCK_QUERY_MAX_DIAGONAL:
+            # model points are ~100km apart so every pixel in a block this
+            # small shares the same nearest model points, query just once at
+            # the center of the block and share those points with every pixel
+            block_center = [
+                edge_carbon_geotransform[3] + edge_carbon_geotransform[5] * (
+                    edge_distance_data['yoff'] +
+                    edge_distance_data['win_ysize'] / 2.0),
+                edge_carbon_geotransform[0] + edge_carbon_geotransform[1] * (
+                    edge_distance_data['xoff'] +
+                    edge_distance_data['win_xsize'] / 2.0)]
+            distances, indexes = kd_tree.query(
+                [block_center], k=n_nearest_model_points,
+                distance_upper_bound=DISTANCE_UPPER_BOUND)
+            distances = distances.reshape(1, n_nearest_model_points)
+            indexes = indexes.reshape(1, n_nearest_model_points)
+
+            # neighboring blocks usually share the same nearest model points
+            # so their model parameters are only looked up once, at worst
+            # two threads both look up the same new entry
+            neighbor_key = tuple(indexes[0])
+            if neighbor_key not in model_parameter_cache:
+                model_parameter_cache[neighbor_key] = (
+                    _gather_model_parameters(
+                        indexes, theta_model_parameters,
+                        method_model_parameter))
+            model_method, model_thetas = model_parameter_cache[neighbor_key]
+
+            # only the nearest points are shared, the inverse distance weights
+            # still use each pixel's own distance to those points
+            valid_index_mask = indexes[0] != kd_tree.n
+            model_points = kd_tree.data[indexes[0][valid_index_mask]]
+            distances = numpy.full(
+                (row_index.size, n_nearest_model_points), numpy.inf)
+            distances[:, valid_index_mask] = numpy.hypot(
+                row_coords[:, numpy.newaxis] - model_points[:, 0],
+                col_coords[:, numpy.newaxis] - model_points[:, 1])
+            # match the per pixel query, which ignores points this far away
+            distances[distances >= DISTANCE_UPPER_BOUND] = numpy.inf
+        else:
+            # query nearest points for every valid point in the block, this
+            # already runs on one of the pool's threads so the query itself
+            # is single threaded
+            coord_points = numpy.stack([row_coords, col_coords], axis=1)
+            # note, the 'n_jobs' parameter was introduced in SciPy 0.16.0
+            distances, indexes = kd_tree.query(
+                coord_points, k=n_nearest_model_points,
+                distance_upper_bound=DISTANCE_UPPER_BOUND, n_jobs=1)
+
+            if n_nearest_model_points == 1:
+                distances = distances.reshape(distances.shape[0], 1)
+                indexes = indexes.reshape(indexes.shape[0], 1)
+
+            model_method, model_thetas = _gather_model_parameters(
+                indexes, theta_model_parameters, method_model_parameter)
+
+        # convert once per pixel to the km the models expect, the masked
+        # selection is already a copy so it's scaled in place
+        valid_edge_distances_km = edge_distance_block[row_index, col_index]
+        valid_edge_distances_km *= cell_size_km
+
+        return row_index, col_index, _calculate_edge_carbon(
+            valid_edge_distances_km, distances, model_method, model_thetas,
+            n_nearest_model_points, cell_area_ha,
+            biomass_to_carbon_conversion_factor)
+
+    # a single output buffer is reused for every block, smaller blocks on
+    # the raster edges write from a view into it
+    result_buffer = numpy.empty((0, 0), dtype=numpy.float32)
+
+    # Blocks are independent so they're calculated by a pool of threads
+    # (the kd-tree query and numpy release the GIL) while this thread does
+    # all the raster reads and writes. Only a bounded number of blocks are
+    # in flight so memory use doesn't grow with the raster size.
+    if n_workers > 0:
+        n_threads = n_workers
+    else:
+        n_threads = multiprocessing.cpu_count()
+    max_pending_blocks = 2 * n_threads
+    worker_pool = multiprocessing.pool.ThreadPool(n_threads)
+    pending_block_queue = collections.deque()
+
+    # Loop memory block by memory block, calculating the forest edge carbon
+    # for every forest pixel. The output raster shares the edge distance
+    # raster's block layout so iterating over its native blocks means every
+    # write covers whole output blocks.
+    block_iterator = pygeoprocessing.iterblocks((edge_distance_path, 1))
+    try:
+        while True:
+            for edge_distance_data, edge_distance_block in itertools.islice(
+                    block_iterator,
+                    max_pending_blocks - len(pending_block_queue)):
+                non_forest_mask_block = non_forest_mask_band.ReadAsArray(
+                    **edge_distance_data)
+                pending_block_queue.append((
+                    edge_distance_data, edge_distance_block.shape,
+                    worker_pool.apply_async(
+                        edge_carbon_block_op,
+                        (edge_distance_data, edge_distance_block,
+                         non_forest_mask_block))))
+            if not pending_block_queue:
+                break
+
+            edge_distance_data, block_shape, block_result = (
+                pending_block_queue.popleft())
+            current_time = time.time()
+            if current_time - last_time > 5.0:
+                LOGGER.info(
+                    'Carbon edge calculation approx. %.2f%% complete',
+                    (n_cells_processed / float(n_cells) * 100.0))
+                last_time = current_time
+            n_cells_processed += (
+                edge_distance_data['win_xsize'] *
+                edge_distance_data['win_ysize'])
+
+            row_index, col_index, carbon = block_result.get()
+            # skip blocks without forest, they're already filled with nodata
+            if row_index.size == 0:
+                continue
+
+            if (result_buffer.shape[0] < block_shape[0] or
+                    result_buffer.shape[1] < block_shape[1]):
+                result_buffer = numpy.empty(
+                    (max(result_buffer.shape[0], block_shape[0]),
+                     max(result_buffer.shape[1], block_shape[1])),
+                    dtype=numpy.float32)
+            result = result_buffer[:block_shape[0], :block_shape[1]]
+
+            # Ensure the result has nodata everywhere the distance was invalid
+            result[:] = CARBON_MAP_NODATA
+            result[row_index, col_index] = carbon
+            edge_carbon_band.WriteArray(
+                result, xoff=edge_distance_data['xoff'],
+                yoff=edge_distance_data['yoff'])
+    finally:
+        worker_pool.close()
+        worker_pool.join()
+        non_forest_mask_band = None
+        non_forest_mask_raster = None
     LOGGER.info('Carbon edge calculation 100.0% complete')
 
 
+def _gather_model_parameters(
+        indexes, theta_model_parameters, method_model_parameter):
+    """Look up the carbon edge model parameters of nearest model points.
+
+    Parameters:
+        indexes (numpy.ndarray): 2D array of nearest model point indexes as
+            returned by the kd-tree query, these are
+            ``len(method_model_parameter)`` where no model point was found.
+        theta_model_parameters (tuple): 3 float32 numpy.arrays of length M
+            of the model theta1, theta2 and theta3 parameters.
+        method_model_parameter (numpy.array M): model method numbers (1..3).
+
+    Returns:
+        tuple of (model_method, model_thetas) where ``model_method`` is an
+        int8 array shaped like ``indexes`` of method numbers (1..3) and
+        ``model_thetas`` is a tuple of the theta1, theta2 and theta3 float32
+        arrays shaped like ``indexes``. All are 0 where no point was found.
+
+    """
+    valid_index_mask = indexes != len(method_model_parameter)
+    model_method = numpy.zeros(indexes.shape, dtype=numpy.int8)
+    model_method[valid_index_mask] = (
+        method_model_parameter[indexes[valid_index_mask]])
+    model_thetas = []
+    for theta_model_parameter in theta_model_parameters:
+        model_theta = numpy.zeros(indexes.shape, dtype=numpy.float32)
+        model_theta[valid_index_mask] = (
+            theta_model_parameter[indexes[valid_index_mask]])
+        model_thetas.append(model_theta)
+    return model_method, tuple(model_thetas)
+
+
+def _calculate_edge_carbon(
+        edge_distance_km, distances, model_method, model_thetas,
+        n_nearest_model_points, cell_area_ha,
+        biomass_to_carbon_conversion_factor):
+    """Calculate forest edge carbon from the nearest carbon model points.
+
+    ``distances`` has a row per pixel. ``model_method`` and
+    ``model_thetas`` either have a row per pixel or a single row that is
+    shared by all the pixels.
+
+    Parameters:
+        edge_distance_km (numpy.ndarray): 1D float32 array of N distances
+            from forest pixels to the forest edge in kilometers.
+        distances (numpy.ndarray): N x n_nearest_model_points array
+            of distances to the nearest model points, these are
+            ``numpy.inf`` where no model point was found.
+        model_method (numpy.ndarray): int8 array shaped like ``distances`` of
+            the nearest model points' method numbers (1..3), 0 where no
+            model point was found.
+        model_thetas (tuple): the nearest model points' theta1, theta2 and
+            theta3 as float32 arrays shaped like ``distances``.
+        n_nearest_model_points (int): number of nearest model points searched
+            for.
+        cell_area_ha (float): area of a pixel in hectares.
+        biomass_to_carbon_conversion_factor (float): number by which to
+            multiply the biomass by to get carbon.
+
+    Returns:
+        numpy.ndarray of N float32 carbon stocks, the inverse distance
+        weighted average of the pixel's nearest model biomasses converted to
+        carbon.
+
+    """
+    # nearest points are sorted by distance so any that weren't found within
+    # the search distance are at the end of each row, drop the trailing
+    # columns where no pixel found a model point
+    n_found_points = numpy.max(numpy.sum(model_method != 0, axis=1))
+    if n_found_points < model_method.shape[1]:
+        distances = distances[:, :n_found_points]
+        model_method = model_method[:, :n_found_points]
+        model_thetas = tuple(
+            model_theta[:, :n_found_points] for model_theta in model_thetas)
+
+    # share rows across pixels and each pixel's edge distance across its
+    # nearest points without making copies
+    pixel_shape = (edge_distance_km.shape[0], model_method.shape[1])
+    edge_distance_km = numpy.broadcast_to(
+        edge_distance_km[:, numpy.newaxis], pixel_shape)
+    model_method = numpy.broadcast_to(model_method, pixel_shape)
+    model_thetas = tuple(
+        numpy.broadcast_to(model_theta, pixel_shape)
+        for model_theta in model_thetas)
+
+    # evaluate only the regression model used by each nearest point. Thetas
+    # and edge distances are float32 so the biomass math stays in float32.
+    biomass = numpy.zeros(pixel_shape, dtype=numpy.float32)
+
+    # asymptotic model
+    # biomass_1 = t1 - t2 * exp(-t3 * edge_dist_km)
+    method_mask = model_method == 1
+    theta1, theta2, theta3 = [
+        model_theta[method_mask] for model_theta in model_thetas]
+    biomass[method_mask] = theta1 - theta2 * numpy.exp(
+        -theta3 * edge_distance_km[method_mask])
+
+    # logarithmic model
+    # biomass_2 = t1 + t2 * numpy.log(edge_dist_km)
+    # NOTE: theta3 is ignored for this method
+    method_mask = model_method == 2
+    theta1, theta2 = [
+        model_theta[method_mask] for model_theta in model_thetas[:2]]
+    biomass[method_mask] = theta1 + theta2 * numpy.log(
+        edge_distance_km[method_mask])
+
+    # linear regression
+    # biomass_3 = t1 + t2 * edge_dist_km
+    method_mask = model_method == 3
+    theta1, theta2 = [
+        model_theta[method_mask] for model_theta in model_thetas[:2]]
+    biomass[method_mask] = theta1 + theta2 * edge_distance_km[method_mask]
+
+    biomass *= cell_area_ha
+
+    # here distances are distances to each valid model point, not distance
+    # to edge of forest
+    weights = numpy.zeros(distances.shape, dtype=numpy.float32)
+    valid_distance_mask = (distances > 0) & (distances < numpy.inf)
+    weights[valid_distance_mask] = (
+        n_nearest_model_points / distances[valid_distance_mask])
+
+    # normalize by the sum of the weights per pixel (axis 1), rows without
+    # any weight are left at 0 to avoid a divide by 0
+    denom = numpy.sum(weights, axis=1)
+    valid_denom = denom != 0
+    weights[valid_denom] /= denom[valid_denom, numpy.newaxis]
+    # multiply and reduce in one pass rather than materializing the
+    # weighted biomass array
+    average_biomass = numpy.einsum('ij,ij->i', weights, biomass)
+
+    # convert biomass to carbon in this stage
+    return average_biomass * biomass_to_carbon_conversion_factor
+
+
 @validation.invest_validator
 def validate(args, limit_to=None):
     """Validate args to ensure they conform to `execute`'s contract.
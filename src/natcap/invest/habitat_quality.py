@@ -3,11 +3,15 @@ from __future__ import absolute_import
 import collections
 import os
 import logging
+import shutil
+import tempfile
 
 import numpy
+import scipy.ndimage
 from osgeo import gdal
 from osgeo import osr
 import pygeoprocessing
+import taskgraph
 
 from . import utils
 from . import validation
@@ -17,6 +21,30 @@ LOGGER = logging.getLogger('natcap.invest.habitat_quality')
 _OUT_NODATA = -1.0
 _RARITY_NODATA = -64329.0
 _SCALING_PARAM = 2.5
+# keys that must be present in `args` and have a value
+_REQUIRED_ARGS_KEYS = (
+    'workspace_dir',
+    'lulc_cur_path',
+    'threat_raster_folder',
+    'threats_table_path',
+    'sensitivity_table_path',
+    'half_saturation_constant')
+# largest pixel value that raster_pixel_count will tally with numpy.bincount
+_MAX_BINCOUNT_VALUE = 2**20
+# odd sized kernels with fewer pixels than this are convolved directly
+# instead of with pygeoprocessing's FFT based convolve_2d
+_MAX_DIRECT_CONVOLUTION_KERNEL_PIXELS = 128
+# number of signal pixels read at a time for direct convolution
+_DIRECT_CONVOLUTION_STRIP_PIXELS = 2**22
+# nodata value of direct convolution output; same as convolve_2d's default
+_CONVOLUTION_NODATA = float(numpy.finfo(numpy.float32).min)
+# aligned inputs are written as tiled GeoTIFFs so that block reads in the
+# rest of the model line up with the file's tiles
+_ALIGNED_GTIFF_CREATION_OPTIONS = (
+    'TILED=YES', 'BIGTIFF=YES', 'COMPRESS=LZW', 'BLOCKXSIZE=512',
+    'BLOCKYSIZE=512')
+# linear decay kernels wider than this are written in strips of rows
+_MAX_IN_MEMORY_KERNEL_SIZE = 2**12
 
 
 def execute(args):
@@ -50,6 +78,9 @@ def execute(args):
             (required)
         suffix (string): a python string that will be inserted into all
             raster path paths just before the file extension.
+        n_workers (int): (optional) The number of worker processes to
+            use for processing this model.  If omitted, computation will take
+            place in the current process.
 
     Example Args Dictionary::
 
@@ -81,6 +112,26 @@ def execute(args):
     kernel_dir = os.path.join(inter_dir, 'kernels')
     utils.make_directories([inter_dir, out_dir, kernel_dir])
 
+    work_token_dir = os.path.join(inter_dir, '_tmp_work_tokens')
+    try:
+        n_workers = int(args['n_workers'])
+    except (KeyError, ValueError, TypeError):
+        # KeyError when n_workers is not present in args
+        # ValueError when n_workers is an empty string.
+        # TypeError when n_workers is None.
+        n_workers = 0  # Threaded queue management, but same process.
+    task_graph = taskgraph.TaskGraph(work_token_dir, n_workers)
+
+    # raster info of each raster path, so every raster is only opened once
+    raster_info_cache = {}
+
+    def _get_raster_info(raster_path):
+        """Return pygeoprocessing.get_raster_info(raster_path), cached."""
+        if raster_path not in raster_info_cache:
+            raster_info_cache[raster_path] = (
+                pygeoprocessing.get_raster_info(raster_path))
+        return raster_info_cache[raster_path]
+
     # get a handle on the folder with the threat rasters
     threat_raster_dir = args['threat_raster_folder']
 
@@ -91,7 +142,7 @@ def execute(args):
 
     # check that the required headers exist in the sensitivity table.
     # Raise exception if they don't.
-    sens_header_list = sensitivity_dict.items()[0][1].keys()
+    sens_header_list = list(next(iter(sensitivity_dict.values())).keys())
     required_sens_header_list = ['LULC', 'NAME', 'HABITAT']
     missing_sens_header_list = [
         h for h in required_sens_header_list if h not in sens_header_list]
@@ -122,9 +173,9 @@ def execute(args):
     # pertaining to the different threats
     lulc_path_dict = {}
     threat_path_dict = {}
-    # also store land cover and threat rasters in a list
-    lulc_and_threat_raster_list = []
-    aligned_raster_list = []
+    # also map each distinct land cover and threat raster to the path of its
+    # aligned copy, so a raster used more than once is only aligned once
+    aligned_raster_path_map = collections.OrderedDict()
     # declare a set to store unique codes from lulc rasters
     raster_unique_lucodes = set()
 
@@ -135,26 +186,8 @@ def execute(args):
         if lulc_args in args:
             lulc_path = args[lulc_args]
             lulc_path_dict[lulc_key] = lulc_path
-            # save land cover paths in a list for alignment and resize
-            lulc_and_threat_raster_list.append(lulc_path)
-            aligned_raster_list.append(
-                os.path.join(
-                    inter_dir, os.path.basename(lulc_path).replace(
-                        '.tif', '_aligned.tif')))
-
-            # save unique codes to check if it's missing in sensitivity table
-            for _, lulc_block in pygeoprocessing.iterblocks((lulc_path, 1)):
-                raster_unique_lucodes.update(numpy.unique(lulc_block))
-
-            # Remove the nodata value from the set of landuser codes.
-            nodata = pygeoprocessing.get_raster_info(lulc_path)['nodata'][0]
-            try:
-                raster_unique_lucodes.remove(nodata)
-            except KeyError:
-                # KeyError when the nodata value was not encountered in the
-                # raster's pixel values.  Same result when nodata value is
-                # None.
-                pass
+            # save land cover paths for alignment and resize
+            aligned_raster_path_map[lulc_path] = None
 
             # add a key to the threat dictionary that associates all threat
             # rasters with this land cover
@@ -169,14 +202,42 @@ def execute(args):
                         os.path.join(threat_raster_dir, threat + lulc_key),
                         raise_error=(lulc_key != '_b')))
 
-                # save threat paths in a list for alignment and resize
+                # save threat paths for alignment and resize
                 threat_path = threat_path_dict['threat' + lulc_key][threat]
                 if threat_path:
-                    lulc_and_threat_raster_list.append(threat_path)
-                    aligned_raster_list.append(
-                        os.path.join(
-                            inter_dir, os.path.basename(lulc_path).replace(
-                                '.tif', '_aligned.tif')))
+                    aligned_raster_path_map[threat_path] = None
+
+    # Align and resize all the land cover and threat rasters,
+    # and tore them in the intermediate folder
+    LOGGER.info('Starting aligning and resizing land cover and threat rasters')
+
+    lulc_pixel_size = _get_raster_info(args['lulc_cur_path'])['pixel_size']
+
+    for path in aligned_raster_path_map:
+        aligned_raster_path_map[path] = os.path.join(
+            inter_dir, os.path.basename(path).replace('.tif', '_aligned.tif'))
+    base_raster_list = list(aligned_raster_path_map.keys())
+    aligned_raster_list = list(aligned_raster_path_map.values())
+
+    align_task = task_graph.add_task(
+        func=pygeoprocessing.align_and_resize_raster_stack,
+        args=(
+            base_raster_list, aligned_raster_list,
+            ['near']*len(base_raster_list), lulc_pixel_size,
+            'intersection'),
+        kwargs={'gtiff_creation_options': _ALIGNED_GTIFF_CREATION_OPTIONS},
+        target_path_list=aligned_raster_list,
+        task_name='align_rasters')
+
+    # save unique codes to check if it's missing in sensitivity table while
+    # the rasters are aligned (raster_pixel_count already excludes the
+    # nodata value)
+    for lulc_path in set(lulc_path_dict.values()):
+        raster_unique_lucodes.update(raster_pixel_count(lulc_path))
+
+    align_task.join()
+    LOGGER.info('Finished aligning and resizing land cover and threat rasters')
+
     # check if there's any lucode from the LULC rasters missing in the
     # sensitivity table
     table_unique_lucodes = set(sensitivity_dict.keys())
@@ -188,35 +249,14 @@ def execute(args):
             'to see if they are missing: %s. \n\n' %
             ', '.join([str(x) for x in sorted(missing_lucodes)]))
 
-    # Align and resize all the land cover and threat rasters,
-    # and tore them in the intermediate folder
-    LOGGER.info('Starting aligning and resizing land cover and threat rasters')
-
-    lulc_pixel_size = (
-        pygeoprocessing.get_raster_info(args['lulc_cur_path']))['pixel_size']
-
-    aligned_raster_list = [
-        os.path.join(inter_dir, os.path.basename(path).replace(
-            '.tif', '_aligned.tif')) for path in lulc_and_threat_raster_list]
-
-    pygeoprocessing.align_and_resize_raster_stack(
-        lulc_and_threat_raster_list, aligned_raster_list,
-        ['near']*len(lulc_and_threat_raster_list), lulc_pixel_size,
-        'intersection')
-
-    LOGGER.info('Finished aligning and resizing land cover and threat rasters')
-
     # Modify paths in lulc_path_dict and threat_path_dict to be aligned rasters
-    for lulc_key, lulc_path in lulc_path_dict.iteritems():
-        lulc_path_dict[lulc_key] = os.path.join(
-            inter_dir, os.path.basename(lulc_path).replace(
-                '.tif', '_aligned.tif'))
+    for lulc_key, lulc_path in lulc_path_dict.items():
+        lulc_path_dict[lulc_key] = aligned_raster_path_map[lulc_path]
         for threat in threat_dict:
             threat_path = threat_path_dict['threat' + lulc_key][threat]
-            if threat_path in lulc_and_threat_raster_list:
-                threat_path_dict['threat' + lulc_key][threat] = os.path.join(
-                    inter_dir, os.path.basename(threat_path).replace(
-                        '.tif', '_aligned.tif'))
+            if threat_path in aligned_raster_path_map:
+                threat_path_dict['threat' + lulc_key][threat] = (
+                    aligned_raster_path_map[threat_path])
 
     LOGGER.info('Starting habitat_quality biophysical calculations')
 
@@ -224,7 +264,7 @@ def execute(args):
     # else set to the value according to the ACCESS attribute
     cur_lulc_path = lulc_path_dict['_c']
     fill_value = 1.0
-    try:
+    if args.get('access_vector_path'):
         LOGGER.info('Handling Access Shape')
         access_raster_path = os.path.join(
             inter_dir, 'access_layer%s.tif' % suffix)
@@ -235,60 +275,68 @@ def execute(args):
         pygeoprocessing.rasterize(
             args['access_vector_path'], access_raster_path, burn_values=None,
             option_list=['ATTRIBUTE=ACCESS'])
-
-    except KeyError:
-        LOGGER.info(
-            'No Access Shape Provided, access raster filled with 1s.')
+    else:
+        # without an access raster every pixel is fully accessible, so
+        # degradation is not scaled at all
+        LOGGER.info('No Access Shape Provided, all pixels fully accessible.')
+        access_raster_path = None
 
     # calculate the weight sum which is the sum of all the threats' weights
     weight_sum = 0.0
-    for threat_data in threat_dict.itervalues():
+    for threat_data in threat_dict.values():
         # Sum weight of threats
         weight_sum = weight_sum + threat_data['WEIGHT']
 
     LOGGER.debug('lulc_path_dict : %s', lulc_path_dict)
 
     # for each land cover raster provided compute habitat quality
-    for lulc_key, lulc_path in lulc_path_dict.iteritems():
+    for lulc_key, lulc_path in lulc_path_dict.items():
         LOGGER.info('Calculating habitat quality for landuse: %s', lulc_path)
 
+        # check that every threat raster exists for this land cover before
+        # scheduling any work for it
+        missing_threat_list = [
+            threat for threat in threat_dict
+            if threat_path_dict['threat' + lulc_key][threat] is None]
+        if missing_threat_list:
+            LOGGER.info(
+                'The threat raster for %s could not be found for the land '
+                'cover %s. Skipping Habitat Quality calculation for this '
+                'land cover.' % (missing_threat_list[0], lulc_key))
+            continue
+
         # Create raster of habitat based on habitat field
         habitat_raster_path = os.path.join(
             inter_dir, 'habitat%s%s.tif' % (lulc_key, suffix))
-        map_raster_to_dict_values(
-            lulc_path, habitat_raster_path, sensitivity_dict, 'HABITAT',
-            _OUT_NODATA, values_required=False)
+        habitat_raster_task = task_graph.add_task(
+            func=map_raster_to_dict_values,
+            args=(lulc_path, habitat_raster_path, sensitivity_dict, 'HABITAT',
+                  _OUT_NODATA, False),
+            target_path_list=[habitat_raster_path],
+            task_name='habitat_raster%s' % lulc_key)
 
         # initialize a list that will store all the threat/threat rasters
         # after they have been adjusted for distance, weight, and access
         deg_raster_list = []
 
         # a list to keep track of the normalized weight for each threat
-        weight_list = numpy.array([])
+        weight_list = []
 
-        # variable to indicate whether we should break out of calculations
-        # for a land cover because a threat raster was not found
-        exit_landcover = False
+        # the tasks that create the rasters in deg_raster_list
+        deg_task_list = []
 
         # adjust each threat/threat raster for distance, weight, and access
-        for threat, threat_data in threat_dict.iteritems():
+        for threat, threat_data in threat_dict.items():
             LOGGER.info('Calculating threat: %s.\nThreat data: %s' %
                         (threat, threat_data))
 
             # get the threat raster for the specific threat
             threat_raster_path = threat_path_dict['threat' + lulc_key][threat]
             LOGGER.info('threat_raster_path %s', threat_raster_path)
-            if threat_raster_path is None:
-                LOGGER.info(
-                    'The threat raster for %s could not be found for the land '
-                    'cover %s. Skipping Habitat Quality calculation for this '
-                    'land cover.' % (threat, lulc_key))
-                exit_landcover = True
-                break
 
             # need the pixel size for the threat raster so we can create
             # an appropriate kernel for convolution
-            threat_pixel_size = pygeoprocessing.get_raster_info(
+            threat_pixel_size = _get_raster_info(
                 threat_raster_path)['pixel_size']
             # pixel size tuple could have negative value
             mean_threat_pixel_size = (
@@ -308,136 +356,81 @@ def execute(args):
             kernel_path = os.path.join(
                 kernel_dir, 'kernel_%s%s%s.tif' % (threat, lulc_key, suffix))
             if decay_type == 'linear':
-                make_linear_decay_kernel_path(max_dist_pixel, kernel_path)
+                kernel_func = make_linear_decay_kernel_path
             elif decay_type == 'exponential':
-                utils.exponential_decay_kernel_raster(
-                    max_dist_pixel, kernel_path)
+                kernel_func = utils.exponential_decay_kernel_raster
             else:
                 raise ValueError(
                     "Unknown type of decay in biophysical table, should be "
                     "either 'linear' or 'exponential'. Input was %s for threat"
                     " %s." % (decay_type, threat))
+            kernel_task = task_graph.add_task(
+                func=kernel_func,
+                args=(max_dist_pixel, kernel_path),
+                target_path_list=[kernel_path],
+                task_name='kernel_%s%s' % (threat, lulc_key))
 
             filtered_threat_raster_path = os.path.join(
                 inter_dir, 'filtered_%s%s%s.tif' % (threat, lulc_key, suffix))
-            pygeoprocessing.convolve_2d(
-                (threat_raster_path, 1), (kernel_path, 1),
-                filtered_threat_raster_path)
+            convolve_task = task_graph.add_task(
+                func=_convolve_2d_data_extent,
+                args=(
+                    threat_raster_path, kernel_path,
+                    filtered_threat_raster_path),
+                target_path_list=[filtered_threat_raster_path],
+                dependent_task_list=[kernel_task],
+                task_name='convolve_%s%s' % (threat, lulc_key))
 
             # create sensitivity raster based on threat
             sens_raster_path = os.path.join(
                 inter_dir, 'sens_%s%s%s.tif' % (threat, lulc_key, suffix))
-            map_raster_to_dict_values(
-                lulc_path, sens_raster_path, sensitivity_dict, 'L_' + threat,
-                _OUT_NODATA, values_required=True)
+            sens_task = task_graph.add_task(
+                func=map_raster_to_dict_values,
+                args=(lulc_path, sens_raster_path, sensitivity_dict,
+                      'L_' + threat, _OUT_NODATA, True),
+                target_path_list=[sens_raster_path],
+                task_name='sens_%s%s' % (threat, lulc_key))
 
             # get the normalized weight for each threat
             weight_avg = threat_data['WEIGHT'] / weight_sum
 
             # add the threat raster adjusted by distance and the raster
             # representing sensitivity to the list to be past to
-            # vectorized_rasters below
+            # _calculate_total_degradation below
             deg_raster_list.append(filtered_threat_raster_path)
             deg_raster_list.append(sens_raster_path)
+            deg_task_list.extend([convolve_task, sens_task])
 
             # store the normalized weight for each threat in a list that
-            # will be used below in total_degradation
-            weight_list = numpy.append(weight_list, weight_avg)
+            # will be used below in _calculate_total_degradation
+            weight_list.append(weight_avg)
 
-        # check to see if we got here because a threat raster was missing
-        # and if so then we want to skip to the next landcover
-        if exit_landcover:
-            continue
-
-        def total_degradation(*raster):
-            """A vectorized function that computes the degradation value for
-                each pixel based on each threat and then sums them together
-
-                *rasters - a list of floats depicting the adjusted threat
-                    value per pixel based on distance and sensitivity.
-                    The values are in pairs so that the values for each threat
-                    can be tracked:
-                    [filtered_val_threat1, sens_val_threat1,
-                     filtered_val_threat2, sens_val_threat2, ...]
-                    There is an optional last value in the list which is the
-                    access_raster value, but it is only present if
-                    access_raster is not None.
-
-                returns - the total degradation score for the pixel"""
-
-            # we can not be certain how many threats the user will enter,
-            # so we handle each filtered threat and sensitivity raster
-            # in pairs
-            sum_degradation = numpy.zeros(raster[0].shape)
-            for index in range(len(raster) / 2):
-                step = index * 2
-                sum_degradation += (
-                    raster[step] * raster[step + 1] * weight_list[index])
-
-            nodata_mask = numpy.empty(raster[0].shape, dtype=numpy.int8)
-            nodata_mask[:] = 0
-            for array in raster:
-                nodata_mask = nodata_mask | (array == _OUT_NODATA)
-
-            # the last element in raster is access
-            return numpy.where(
-                    nodata_mask, _OUT_NODATA, sum_degradation * raster[-1])
-
-        # add the access_raster onto the end of the collected raster list. The
-        # access_raster will be values from the shapefile if provided or a
-        # raster filled with all 1's if not
-        deg_raster_list.append(access_raster_path)
+        # add the access_raster onto the end of the collected raster list if
+        # an access shapefile was provided
+        if access_raster_path is not None:
+            deg_raster_list.append(access_raster_path)
 
         deg_sum_raster_path = os.path.join(
             out_dir, 'deg_sum' + lulc_key + suffix + '.tif')
 
-        LOGGER.info('Starting raster calculation on total_degradation')
-
-        deg_raster_band_list = [(path, 1) for path in deg_raster_list]
-        pygeoprocessing.raster_calculator(
-            deg_raster_band_list, total_degradation,
-            deg_sum_raster_path, gdal.GDT_Float32, _OUT_NODATA)
-
-        LOGGER.info('Finished raster calculation on total_degradation')
-
-        # Compute habitat quality
-        # ksq: a term used below to compute habitat quality
-        ksq = half_saturation**_SCALING_PARAM
-
-        def quality_op(degradation, habitat):
-            """Vectorized function that computes habitat quality given
-                a degradation and habitat value.
-
-                degradation - a float from the created degradation
-                    raster above.
-                habitat - a float indicating habitat suitability from
-                    from the habitat raster created above.
-
-                returns - a float representing the habitat quality
-                    score for a pixel
-            """
-            degredataion_clamped = numpy.where(degradation < 0, 0, degradation)
-
-            return numpy.where(
-                    (degradation == _OUT_NODATA) | (habitat == _OUT_NODATA),
-                    _OUT_NODATA,
-                    (habitat * (1.0 - ((degredataion_clamped**_SCALING_PARAM) /
-                     (degredataion_clamped**_SCALING_PARAM + ksq)))))
+        total_degradation_task = task_graph.add_task(
+            func=_calculate_total_degradation,
+            args=(deg_raster_list, weight_list, deg_sum_raster_path),
+            target_path_list=[deg_sum_raster_path],
+            dependent_task_list=deg_task_list,
+            task_name='total_degradation%s' % lulc_key)
 
         quality_path = os.path.join(
             out_dir, 'quality' + lulc_key + suffix + '.tif')
 
-        LOGGER.info('Starting raster calculation on quality_op')
-
-        deg_hab_raster_list = [deg_sum_raster_path, habitat_raster_path]
-
-        deg_hab_raster_band_list = [
-            (path, 1) for path in deg_hab_raster_list]
-        pygeoprocessing.raster_calculator(
-            deg_hab_raster_band_list, quality_op, quality_path,
-            gdal.GDT_Float32, _OUT_NODATA)
-
-        LOGGER.info('Finished raster calculation on quality_op')
+        task_graph.add_task(
+            func=_calculate_habitat_quality,
+            args=(deg_sum_raster_path, habitat_raster_path, half_saturation,
+                  quality_path),
+            target_path_list=[quality_path],
+            dependent_task_list=[
+                total_degradation_task, habitat_raster_task],
+            task_name='habitat_quality%s' % lulc_key)
 
     # Compute Rarity if user supplied baseline raster
     if '_b' not in lulc_path_dict:
@@ -447,11 +440,10 @@ def execute(args):
 
         # get the area of a base pixel to use for computing rarity where the
         # pixel sizes are different between base and cur/fut rasters
-        base_pixel_size = pygeoprocessing.get_raster_info(
-            lulc_base_path)['pixel_size']
+        base_raster_info = _get_raster_info(lulc_base_path)
+        base_pixel_size = base_raster_info['pixel_size']
         base_area = float(abs(base_pixel_size[0]) * abs(base_pixel_size[1]))
-        base_nodata = pygeoprocessing.get_raster_info(
-            lulc_base_path)['nodata'][0]
+        base_nodata = base_raster_info['nodata'][0]
 
         lulc_code_count_b = raster_pixel_count(lulc_base_path)
 
@@ -463,11 +455,10 @@ def execute(args):
             lulc_time = 'current' if lulc_key == '_c' else 'future'
 
             # get the area of a cur/fut pixel
-            lulc_pixel_size = pygeoprocessing.get_raster_info(
-                lulc_path)['pixel_size']
+            lulc_raster_info = _get_raster_info(lulc_path)
+            lulc_pixel_size = lulc_raster_info['pixel_size']
             lulc_area = float(abs(lulc_pixel_size[0]) * abs(lulc_pixel_size[1]))
-            lulc_nodata = pygeoprocessing.get_raster_info(
-                lulc_path)['nodata'][0]
+            lulc_nodata = lulc_raster_info['nodata'][0]
 
             def trim_op(base, cover_x):
                 """Trim cover_x to the mask of base.
@@ -512,7 +503,7 @@ def execute(args):
             # compute rarity index for each lulc code
             # define 0.0 if an lulc code is found in the cur/fut landcover
             # but not the baseline
-            for code in lulc_code_count_x.iterkeys():
+            for code in lulc_code_count_x:
                 if code in lulc_code_count_b:
                     numerator = lulc_code_count_x[code] * lulc_area
                     denominator = lulc_code_count_b[code] * base_area
@@ -530,9 +521,342 @@ def execute(args):
 
             LOGGER.info('Finished rarity computation on %s land cover.'
                         % lulc_time)
+
+    task_graph.close()
+    task_graph.join()
     LOGGER.info('Finished habitat_quality biophysical calculations')
 
 
+def _calculate_total_degradation(
+        deg_raster_list, weight_list, target_deg_sum_raster_path):
+    """Sum the weighted degradation of every threat.
+
+    Parameters:
+        deg_raster_list (list): list of raster paths in pairs so that the
+            values for each threat can be tracked:
+            [filtered_threat1, sens_threat1, filtered_threat2, sens_threat2,
+             ...] optionally followed by the path to an access raster that
+            scales the total degradation.
+        weight_list (list): normalized weight of each threat in the same
+            order as the threat pairs in `deg_raster_list`.
+        target_deg_sum_raster_path (string): path to the total degradation
+            raster to create.
+
+    Returns:
+        None
+    """
+    # the target raster is Float32, so keep every intermediate array in
+    # float32 rather than letting numpy promote them to float64
+    weight_array = numpy.array(weight_list, dtype=numpy.float32)
+    n_threats = len(weight_list)
+
+    def total_degradation(*raster):
+        """Computes the total degradation value for each pixel.
+
+        Parameters:
+            raster (list): list of numpy.ndarrays in the order of
+                `deg_raster_list`.
+
+        Returns:
+            the total degradation score for the pixel, or _OUT_NODATA where
+            any input is nodata.
+        """
+        # we can not be certain how many threats the user will enter,
+        # so we handle each filtered threat and sensitivity raster
+        # in pairs, reusing one scratch buffer rather than allocating
+        # temporaries for every threat
+        sum_degradation = numpy.zeros(raster[0].shape, dtype=numpy.float32)
+        threat_degradation = numpy.empty(
+            raster[0].shape, dtype=numpy.float32)
+        # every sensitivity raster is reclassified from the same landcover
+        # with values required, so they share one nodata mask and only the
+        # first needs to be checked. If there is an odd raster out at the
+        # end it is access.
+        nodata_mask = numpy.zeros(raster[0].shape, dtype=numpy.bool)
+        if n_threats > 0:
+            nodata_mask |= raster[1] == _OUT_NODATA
+        for index in range(n_threats):
+            step = index * 2
+            numpy.multiply(
+                raster[step], raster[step + 1], out=threat_degradation)
+            threat_degradation *= weight_array[index]
+            sum_degradation += threat_degradation
+            nodata_mask |= raster[step] == _OUT_NODATA
+
+        if len(raster) > 2 * n_threats:
+            nodata_mask |= raster[-1] == _OUT_NODATA
+            sum_degradation *= raster[-1]
+        sum_degradation[nodata_mask] = _OUT_NODATA
+        return sum_degradation
+
+    LOGGER.info('Starting raster calculation on total_degradation')
+    pygeoprocessing.raster_calculator(
+        [(path, 1) for path in deg_raster_list], total_degradation,
+        target_deg_sum_raster_path, gdal.GDT_Float32, _OUT_NODATA)
+    LOGGER.info('Finished raster calculation on total_degradation')
+
+
+def _calculate_habitat_quality(
+        deg_sum_raster_path, habitat_raster_path, half_saturation,
+        target_quality_raster_path):
+    """Compute habitat quality from degradation and habitat rasters.
+
+    Parameters:
+        deg_sum_raster_path (string): path to total degradation raster.
+        habitat_raster_path (string): path to habitat suitability raster.
+        half_saturation (float): half saturation constant.
+        target_quality_raster_path (string): path to the habitat quality
+            raster to create.
+
+    Returns:
+        None
+    """
+    # ksq: a term used below to compute habitat quality
+    ksq = numpy.float32(half_saturation**_SCALING_PARAM)
+
+    def quality_op(degradation, habitat):
+        """Vectorized function that computes habitat quality given
+            a degradation and habitat value.
+
+            degradation - a float from the created degradation
+                raster above.
+            habitat - a float indicating habitat suitability from
+                from the habitat raster created above.
+
+            returns - a float representing the habitat quality
+                score for a pixel
+        """
+        nodata_mask = (
+            (degradation == _OUT_NODATA) | (habitat == _OUT_NODATA))
+
+        # raise the clamped degradation to the scaling parameter only once,
+        # keeping the float32 intermediates in place
+        degradation_pow = numpy.maximum(
+            degradation.astype(numpy.float32, copy=False), 0)
+        numpy.power(degradation_pow, _SCALING_PARAM, out=degradation_pow)
+        quality = degradation_pow + ksq
+        numpy.divide(degradation_pow, quality, out=quality)
+        numpy.subtract(1.0, quality, out=quality)
+        quality *= habitat
+        quality[nodata_mask] = _OUT_NODATA
+        return quality
+
+    LOGGER.info('Starting raster calculation on quality_op')
+    pygeoprocessing.raster_calculator(
+        [(deg_sum_raster_path, 1), (habitat_raster_path, 1)], quality_op,
+        target_quality_raster_path, gdal.GDT_Float32, _OUT_NODATA)
+    LOGGER.info('Finished raster calculation on quality_op')
+
+
+def _data_bounding_box(raster_path):
+    """Find the pixel window that contains all valid pixels of a raster.
+
+    Parameters:
+        raster_path (string): path to a single band raster.
+
+    Returns:
+        (xoff, yoff, xsize, ysize) tuple of the smallest window that
+        contains every pixel that is not nodata, or None if the raster is
+        entirely nodata.
+    """
+    nodata = pygeoprocessing.get_raster_info(raster_path)['nodata'][0]
+    x_min, y_min, x_max, y_max = None, None, None, None
+    for offset_dict, raster_block in pygeoprocessing.iterblocks(
+            (raster_path, 1), largest_block=utils.LARGEST_ITERBLOCK):
+        if nodata is None:
+            valid_mask = numpy.ones(raster_block.shape, dtype=numpy.bool)
+        else:
+            valid_mask = raster_block != nodata
+        valid_rows = numpy.nonzero(valid_mask.any(axis=1))[0]
+        if valid_rows.size == 0:
+            continue
+        valid_cols = numpy.nonzero(valid_mask.any(axis=0))[0]
+        block_x_min = offset_dict['xoff'] + valid_cols[0]
+        block_x_max = offset_dict['xoff'] + valid_cols[-1] + 1
+        block_y_min = offset_dict['yoff'] + valid_rows[0]
+        block_y_max = offset_dict['yoff'] + valid_rows[-1] + 1
+        if x_min is None:
+            x_min, y_min, x_max, y_max = (
+                block_x_min, block_y_min, block_x_max, block_y_max)
+        else:
+            x_min = min(x_min, block_x_min)
+            y_min = min(y_min, block_y_min)
+            x_max = max(x_max, block_x_max)
+            y_max = max(y_max, block_y_max)
+
+    if x_min is None:
+        return None
+    return (
+        int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min))
+
+
+def _convolve_2d_data_extent(
+        signal_raster_path, kernel_raster_path, target_raster_path):
+    """Convolve only the part of a raster that contains valid pixels.
+
+    The signal raster is cropped to the bounding box of its valid pixels,
+    padded by the kernel radius, before it is convolved.  The convolved
+    window is then pasted into a target raster the size of the signal
+    raster that is otherwise nodata, which matches what
+    ``pygeoprocessing.convolve_2d`` produces on the full signal raster
+    since convolved signal nodata pixels are masked to nodata.
+
+    Parameters:
+        signal_raster_path (string): path to the raster to convolve.
+        kernel_raster_path (string): path to the kernel raster.
+        target_raster_path (string): path to the convolved raster to create.
+
+    Returns:
+        None
+    """
+    signal_raster_info = pygeoprocessing.get_raster_info(signal_raster_path)
+    n_cols, n_rows = signal_raster_info['raster_size']
+    data_bbox = _data_bounding_box(signal_raster_path)
+    if data_bbox is not None:
+        kernel_x_size, kernel_y_size = pygeoprocessing.get_raster_info(
+            kernel_raster_path)['raster_size']
+        x_radius = kernel_x_size // 2 + 1
+        y_radius = kernel_y_size // 2 + 1
+        xoff = max(0, data_bbox[0] - x_radius)
+        yoff = max(0, data_bbox[1] - y_radius)
+        xsize = min(n_cols, data_bbox[0] + data_bbox[2] + x_radius) - xoff
+        ysize = min(n_rows, data_bbox[1] + data_bbox[3] + y_radius) - yoff
+    if data_bbox is None or (xsize, ysize) == (n_cols, n_rows):
+        # nothing to crop off
+        _convolve_2d(
+            signal_raster_path, kernel_raster_path, target_raster_path)
+        return
+
+    LOGGER.debug(
+        'Convolving %s in window %s', signal_raster_path,
+        (xoff, yoff, xsize, ysize))
+    crop_dir = tempfile.mkdtemp(dir=os.path.dirname(target_raster_path))
+    try:
+        cropped_signal_path = os.path.join(crop_dir, 'signal.tif')
+        cropped_target_path = os.path.join(crop_dir, 'target.tif')
+        signal_raster = gdal.OpenEx(signal_raster_path, gdal.OF_RASTER)
+        gdal.Translate(
+            cropped_signal_path, signal_raster,
+            srcWin=[xoff, yoff, xsize, ysize])
+        signal_raster = None
+
+        _convolve_2d(
+            cropped_signal_path, kernel_raster_path, cropped_target_path)
+
+        cropped_target_info = pygeoprocessing.get_raster_info(
+            cropped_target_path)
+        target_nodata = cropped_target_info['nodata'][0]
+        pygeoprocessing.new_raster_from_base(
+            signal_raster_path, target_raster_path,
+            cropped_target_info['datatype'], [target_nodata],
+            fill_value_list=[target_nodata])
+        target_raster = gdal.OpenEx(
+            target_raster_path, gdal.OF_RASTER | gdal.GA_Update)
+        target_band = target_raster.GetRasterBand(1)
+        for offset_dict, cropped_block in pygeoprocessing.iterblocks(
+                (cropped_target_path, 1),
+                largest_block=utils.LARGEST_ITERBLOCK):
+            target_band.WriteArray(
+                cropped_block, xoff=xoff+offset_dict['xoff'],
+                yoff=yoff+offset_dict['yoff'])
+        target_band = None
+        target_raster = None
+    finally:
+        shutil.rmtree(crop_dir, ignore_errors=True)
+
+
+def _convolve_2d(signal_raster_path, kernel_raster_path, target_raster_path):
+    """Convolve a raster, directly for small kernels or else with FFTs.
+
+    Parameters:
+        signal_raster_path (string): path to the raster to convolve.
+        kernel_raster_path (string): path to the kernel raster.
+        target_raster_path (string): path to the convolved raster to create.
+
+    Returns:
+        None
+    """
+    kernel_x_size, kernel_y_size = pygeoprocessing.get_raster_info(
+        kernel_raster_path)['raster_size']
+    if (kernel_x_size % 2 == 1 and kernel_y_size % 2 == 1 and
+            kernel_x_size * kernel_y_size <
+            _MAX_DIRECT_CONVOLUTION_KERNEL_PIXELS):
+        _direct_convolve_2d(
+            signal_raster_path, kernel_raster_path, target_raster_path)
+    else:
+        pygeoprocessing.convolve_2d(
+            (signal_raster_path, 1), (kernel_raster_path, 1),
+            target_raster_path)
+
+
+def _direct_convolve_2d(
+        signal_raster_path, kernel_raster_path, target_raster_path):
+    """Convolve a raster with a small odd sized kernel in the spatial domain.
+
+    Produces the same raster as ``pygeoprocessing.convolve_2d`` with its
+    default arguments: signal nodata pixels are treated as 0 and are nodata
+    in the Float64 target, and pixels beyond the raster edge are 0.
+
+    Parameters:
+        signal_raster_path (string): path to the raster to convolve.
+        kernel_raster_path (string): path to a kernel raster with an odd
+            number of rows and columns.
+        target_raster_path (string): path to the convolved raster to create.
+
+    Returns:
+        None
+    """
+    kernel_raster = gdal.OpenEx(kernel_raster_path, gdal.OF_RASTER)
+    kernel_array = kernel_raster.GetRasterBand(1).ReadAsArray().astype(
+        numpy.float64)
+    kernel_raster = None
+    row_radius = kernel_array.shape[0] // 2
+
+    signal_raster_info = pygeoprocessing.get_raster_info(signal_raster_path)
+    signal_nodata = signal_raster_info['nodata'][0]
+    n_cols, n_rows = signal_raster_info['raster_size']
+
+    pygeoprocessing.new_raster_from_base(
+        signal_raster_path, target_raster_path, gdal.GDT_Float64,
+        [_CONVOLUTION_NODATA])
+    signal_raster = gdal.OpenEx(signal_raster_path, gdal.OF_RASTER)
+    signal_band = signal_raster.GetRasterBand(1)
+    target_raster = gdal.OpenEx(
+        target_raster_path, gdal.OF_RASTER | gdal.GA_Update)
+    target_band = target_raster.GetRasterBand(1)
+
+    # convolve full width strips of rows, reading `row_radius` extra rows
+    # above and below each strip so the strip's rows see every pixel under
+    # the kernel
+    rows_per_strip = max(1, _DIRECT_CONVOLUTION_STRIP_PIXELS // n_cols)
+    for row_offset in range(0, n_rows, rows_per_strip):
+        n_strip_rows = min(rows_per_strip, n_rows - row_offset)
+        read_row_offset = max(0, row_offset - row_radius)
+        n_read_rows = min(
+            n_rows, row_offset + n_strip_rows + row_radius) - read_row_offset
+        signal_array = signal_band.ReadAsArray(
+            xoff=0, yoff=read_row_offset, win_xsize=n_cols,
+            win_ysize=n_read_rows).astype(numpy.float64)
+        if signal_nodata is not None:
+            nodata_mask = signal_array == signal_nodata
+            signal_array[nodata_mask] = 0.0
+
+        target_array = scipy.ndimage.convolve(
+            signal_array, kernel_array, mode='constant', cval=0.0)
+        strip_slice = slice(
+            row_offset - read_row_offset,
+            row_offset - read_row_offset + n_strip_rows)
+        target_array = target_array[strip_slice]
+        if signal_nodata is not None:
+            target_array[nodata_mask[strip_slice]] = _CONVOLUTION_NODATA
+        target_band.WriteArray(target_array, xoff=0, yoff=row_offset)
+
+    signal_band = None
+    signal_raster = None
+    target_band = None
+    target_raster = None
+
+
 def resolve_ambiguous_raster_path(path, raise_error=True):
     """Determine real path when we don't know true path extension.
 
@@ -555,7 +879,7 @@ def resolve_ambiguous_raster_path(path, raise_error=True):
     gdal.PushErrorHandler(_error_handler)
 
     # a list of possible extensions for raster datasets. We currently can
-    # handle .tif and directory paths
+    # handle .tif, .img and directory paths
     possible_ext = ['', '.tif', '.img']
 
     # initialize dataset to None in the case that all paths do not exist
@@ -594,21 +918,55 @@ def resolve_ambiguous_raster_path(path, raise_error=True):
 def raster_pixel_count(raster_path):
     """Count unique pixel values in raster.
 
+    Integer rasters are tallied with a single ``numpy.bincount`` per block
+    into one array indexed by pixel value; float rasters, or blocks with
+    negative or very large values, fall back to ``numpy.unique``.
+
     Parameters:
         raster_path (string): path to a raster
 
     Returns:
         dict of pixel values to frequency.
     """
-    nodata = pygeoprocessing.get_raster_info(raster_path)['nodata'][0]
+    raster_info = pygeoprocessing.get_raster_info(raster_path)
+    nodata = raster_info['nodata'][0]
+    is_integer_raster = raster_info['datatype'] in utils.INTEGER_GDAL_TYPES
     counts = collections.defaultdict(int)
-    for _, raster_block in pygeoprocessing.iterblocks((raster_path, 1)):
-        for value, count in zip(
-                *numpy.unique(raster_block, return_counts=True)):
-            if value == nodata:
-                continue
-            counts[value] += count
-    return counts
+    # bincount_array[value] is the number of pixels equal to `value`
+    bincount_array = numpy.zeros(0, dtype=numpy.int64)
+    # a non-negative integer nodata value can be binned along with the valid
+    # pixels and dropped at the end, which avoids masking every block
+    bin_nodata = (
+        is_integer_raster and nodata is not None and
+        0 <= nodata < _MAX_BINCOUNT_VALUE)
+    for _, raster_block in pygeoprocessing.iterblocks(
+            (raster_path, 1), largest_block=utils.LARGEST_ITERBLOCK):
+        raster_block = raster_block.ravel()
+        if nodata is not None and not bin_nodata:
+            raster_block = raster_block[raster_block != nodata]
+        if raster_block.size == 0:
+            continue
+        if (is_integer_raster and raster_block.min() >= 0 and
+                raster_block.max() < _MAX_BINCOUNT_VALUE):
+            block_counts = numpy.bincount(raster_block)
+            if block_counts.size > bincount_array.size:
+                bincount_array = numpy.pad(
+                    bincount_array,
+                    (0, block_counts.size - bincount_array.size),
+                    'constant')
+            bincount_array[:block_counts.size] += block_counts
+        else:
+            for value, count in zip(
+                    *numpy.unique(raster_block, return_counts=True)):
+                if value == nodata:
+                    continue
+                counts[value] += int(count)
+
+    if bin_nodata and int(nodata) < bincount_array.size:
+        bincount_array[int(nodata)] = 0
+    for value in numpy.nonzero(bincount_array)[0]:
+        counts[int(value)] += int(bincount_array[value])
+    return dict(counts)
 
 
 def map_raster_to_dict_values(
@@ -642,7 +1000,7 @@ def map_raster_to_dict_values(
     for key in attr_dict:
         int_attr_dict[int(key)] = float(attr_dict[key][field])
 
-    pygeoprocessing.reclassify_raster(
+    utils.reclassify_raster(
         (key_raster_path, 1), int_attr_dict, out_path, gdal.GDT_Float32,
         out_nodata, values_required)
 
@@ -679,23 +1037,37 @@ def make_linear_decay_kernel_path(max_distance, kernel_path):
     kernel_band = kernel_dataset.GetRasterBand(1)
     kernel_band.SetNoDataValue(-9999)
 
-    col_index = numpy.array(xrange(kernel_size))
-    integration = 0.0
-    for row_index in xrange(kernel_size):
-        distance_kernel_row = numpy.sqrt(
-            (row_index - max_distance) ** 2 +
-            (col_index - max_distance) ** 2).reshape(1, kernel_size)
-        kernel = numpy.where(
-            distance_kernel_row > max_distance, 0.0,
-            (max_distance - distance_kernel_row) / max_distance)
-        integration += numpy.sum(kernel)
-        kernel_band.WriteArray(kernel, xoff=0, yoff=row_index)
-
-    for row_index in xrange(kernel_size):
-        kernel_row = kernel_band.ReadAsArray(
-            xoff=0, yoff=row_index, win_xsize=kernel_size, win_ysize=1)
-        kernel_row /= integration
-        kernel_band.WriteArray(kernel_row, 0, row_index)
+    def _linear_decay_rows(row_offset, n_rows):
+        """Calculate `n_rows` rows of the kernel starting at `row_offset`."""
+        row_index, col_index = numpy.ogrid[
+            row_offset:row_offset+n_rows, 0:kernel_size]
+        distance_kernel = numpy.hypot(
+            row_index - max_distance, col_index - max_distance)
+        return numpy.where(
+            distance_kernel > max_distance, 0.0,
+            (max_distance - distance_kernel) / max_distance)
+
+    if kernel_size <= _MAX_IN_MEMORY_KERNEL_SIZE:
+        kernel = _linear_decay_rows(0, kernel_size)
+        kernel /= numpy.sum(kernel)
+        kernel_band.WriteArray(kernel.astype(numpy.float32))
+    else:
+        # kernel is too large to hold in memory, so calculate it in strips
+        # of rows once to integrate and again to write the normalized values
+        rows_per_strip = 256
+        integration = 0.0
+        for row_offset in range(0, kernel_size, rows_per_strip):
+            integration += numpy.sum(_linear_decay_rows(
+                row_offset, min(rows_per_strip, kernel_size - row_offset)))
+        for row_offset in range(0, kernel_size, rows_per_strip):
+            kernel = _linear_decay_rows(
+                row_offset, min(rows_per_strip, kernel_size - row_offset))
+            kernel /= integration
+            kernel_band.WriteArray(
+                kernel.astype(numpy.float32), xoff=0, yoff=row_offset)
+
+    kernel_band = None
+    kernel_dataset = None
 
 
 @validation.invest_validator
@@ -716,23 +1088,15 @@ def validate(args, limit_to=None):
             the error message in the second part of the tuple. This should
             be an empty list if validation succeeds.
     """
-    missing_key_list = []
-    no_value_list = []
     validation_error_list = []
 
     # required args
-    for key in [
-            'workspace_dir',
-            'lulc_cur_path',
-            'threat_raster_folder',
-            'threats_table_path',
-            'sensitivity_table_path',
-            'half_saturation_constant']:
-        if limit_to is None or limit_to == key:
-            if key not in args:
-                missing_key_list.append(key)
-            elif args[key] in ['', None]:
-                no_value_list.append(key)
+    if limit_to is None:
+        required_key_list = _REQUIRED_ARGS_KEYS
+    else:
+        required_key_list = [
+            key for key in _REQUIRED_ARGS_KEYS if key == limit_to]
+    missing_key_list = [key for key in required_key_list if key not in args]
 
     if missing_key_list:
         # if there are missing keys, raise an exception
@@ -742,45 +1106,46 @@ def validate(args, limit_to=None):
 
     # if any value for required keys is empty, append to the validation
     # error list
-    if no_value_list:
-        for key in no_value_list:
-            if limit_to is None or limit_to == key:
-                validation_error_list.append(([key], 'should have a value'))
-
-    # check for required file existence:
-    for key in [
-            'lulc_cur_path',
-            'threat_raster_folder',
-            'threats_table_path',
-            'sensitivity_table_path']:
-        if (limit_to is None or limit_to == key) and (
-                not os.path.exists(args[key])):
-            validation_error_list.append(
-                ([key], 'not found on disk'))
-
-    # check that existing/optional files are the correct types
+    validation_error_list.extend(
+        ([key], 'should have a value') for key in required_key_list
+        if args[key] in ['', None])
+
+    # check that files exist and that existing/optional files are the
+    # correct types.  gdal.OpenEx returns None for a path that doesn't
+    # exist, so the disk is only checked when a dataset can't be opened, to
+    # tell a missing file apart from one of the wrong type.
+    # the same file may be given for more than one key (e.g. the current
+    # and baseline landcover), so remember whether each path opened
+    opened_path_map = {}
     with utils.capture_gdal_logging():
         for key, key_type in [
                 ('lulc_cur_path', 'raster'),
                 ('lulc_fut_path', 'raster'),
                 ('lulc_bas_path', 'raster'),
-                ('access_vector_path', 'vector')]:
-            if (limit_to is None or limit_to == key) and key in args:
+                ('access_vector_path', 'vector'),
+                ('threat_raster_folder', None),
+                ('threats_table_path', None),
+                ('sensitivity_table_path', None)]:
+            if (limit_to is not None and limit_to != key) or key not in args:
+                continue
+            if key_type is None:
                 if not os.path.exists(args[key]):
                     validation_error_list.append(
                         ([key], 'not found on disk'))
-                    continue
+                continue
+            if (args[key], key_type) not in opened_path_map:
                 if key_type == 'raster':
-                    raster = gdal.OpenEx(args[key])
-                    if raster is None:
-                        validation_error_list.append(
-                            ([key], 'not a raster'))
-                    del raster
-                elif key_type == 'vector':
-                    vector = gdal.OpenEx(args[key])
-                    if vector is None:
-                        validation_error_list.append(
-                            ([key], 'not a vector'))
-                    del vector
+                    dataset = gdal.OpenEx(args[key], gdal.OF_RASTER)
+                else:
+                    dataset = gdal.OpenEx(args[key], gdal.OF_VECTOR)
+                opened_path_map[(args[key], key_type)] = dataset is not None
+                dataset = None
+            if not opened_path_map[(args[key], key_type)]:
+                if not os.path.exists(args[key]):
+                    validation_error_list.append(
+                        ([key], 'not found on disk'))
+                else:
+                    validation_error_list.append(
+                        ([key], 'not a %s' % key_type))
 
     return validation_error_list
@@ -118,6 +118,11 @@ _EXPECTED_FARM_HEADERS = [
     _FARM_SEASON_FIELD, 'crop_type', _HALF_SATURATION_FARM_HEADER,
     _MANAGED_POLLINATORS_FIELD, _FARM_FLORAL_RESOURCES_PATTERN,
     _FARM_NESTING_SUBSTRATE_RE_PATTERN, _CROP_POLLINATOR_DEPENDENCE_FIELD]
+# used to create the blank raster farm fields are rasterized onto without
+# writing every block
+_SPARSE_GTIFF_CREATION_OPTIONS = (
+    'TILED=YES', 'BIGTIFF=YES', 'COMPRESS=LZW', 'BLOCKXSIZE=256',
+    'BLOCKYSIZE=256', 'SPARSE_OK=TRUE')
 
 
 def execute(args):
@@ -229,7 +234,10 @@ def execute(args):
 
     try:
         n_workers = int(args['n_workers'])
-    except KeyError:
+    except (KeyError, ValueError, TypeError):
+        # KeyError when n_workers is not present in args
+        # ValueError when n_workers is an empty string.
+        # TypeError when n_workers is None.
         n_workers = 0  # Threaded queue management, but same process.
     task_graph = taskgraph.TaskGraph(work_token_dir, n_workers)
 
@@ -256,7 +264,7 @@ def execute(args):
 
         landcover_substrate_index_tasks[substrate] = task_graph.add_task(
             task_name='reclassify_to_substrate_%s' % substrate,
-            func=pygeoprocessing.reclassify_raster,
+            func=utils.reclassify_raster,
             args=(
                 (args['landcover_raster_path'], 1),
                 scenario_variables['landcover_substrate_index'][substrate],
@@ -336,7 +344,7 @@ def execute(args):
 
         relative_floral_abudance_task = task_graph.add_task(
             task_name='reclassify_to_floral_abundance_%s' % season,
-            func=pygeoprocessing.reclassify_raster,
+            func=utils.reclassify_raster,
             args=(
                 (args['landcover_raster_path'], 1),
                 scenario_variables['landcover_floral_resources'][season],
@@ -380,46 +388,26 @@ def execute(args):
         relative_floral_abudance_task_map[season] = (
             relative_floral_abudance_task)
 
-    scenario_variables['foraged_flowers_index_path'] = {}
-    foraged_flowers_index_task_map = {}
-    for species in scenario_variables['species_list']:
-        for season in scenario_variables['season_list']:
-            # calculate foraged_flowers_species_season = RA(l(x),j)*fa(s,j)
-            foraged_flowers_index_path = os.path.join(
-                intermediate_output_dir,
-                _FORAGED_FLOWERS_INDEX_FILE_PATTERN % (
-                    species, season, file_suffix))
-            relative_abundance_path = (
-                scenario_variables['relative_floral_abundance_index_path'][
-                    season])
-            mult_by_scalar_op = _MultByScalar(
-                scenario_variables['species_foraging_activity'][
-                    (species, season)])
-            foraged_flowers_index_task_map[(species, season)] = (
-                task_graph.add_task(
-                    task_name='calculate_foraged_flowers_%s_%s' % (
-                        species, season),
-                    func=pygeoprocessing.raster_calculator,
-                    args=(
-                        [(relative_abundance_path, 1)],
-                        mult_by_scalar_op, foraged_flowers_index_path,
-                        gdal.GDT_Float32, _INDEX_NODATA),
-                    dependent_task_list=[
-                        relative_floral_abudance_task_map[season]],
-                    target_path_list=[foraged_flowers_index_path]))
-            scenario_variables['foraged_flowers_index_path'][
-                (species, season)] = foraged_flowers_index_path
-
     pollinator_abundance_path_map = {}
     pollinator_abundance_task_map = {}
     floral_resources_index_path_map = {}
     floral_resources_index_task_map = {}
+    scenario_variables['foraged_flowers_index_path'] = {}
+    alpha_kernel_raster_task_map = {}
     for species in scenario_variables['species_list']:
-        # calculate foraging_effectiveness[species]
+        # calculate foraged_flowers_species_season = RA(l(x),j)*fa(s,j) and
+        # foraging_effectiveness[species]
         # FE(x, s) = sum_j [RA(l(x), j) * fa(s, j)]
-        foraged_flowers_path_band_list = [
-            (scenario_variables['foraged_flowers_index_path'][
-                (species, season)], 1)
+        # together so the floral abundance rasters are only read once
+        for season in scenario_variables['season_list']:
+            scenario_variables['foraged_flowers_index_path'][
+                (species, season)] = os.path.join(
+                    intermediate_output_dir,
+                    _FORAGED_FLOWERS_INDEX_FILE_PATTERN % (
+                        species, season, file_suffix))
+        foraged_flowers_path_list = [
+            scenario_variables['foraged_flowers_index_path'][
+                (species, season)]
             for season in scenario_variables['season_list']]
         local_foraging_effectiveness_path = os.path.join(
             intermediate_output_dir,
@@ -428,15 +416,20 @@ def execute(args):
 
         local_foraging_effectiveness_task = task_graph.add_task(
             task_name='local_foraging_effectiveness_%s' % species,
-            func=pygeoprocessing.raster_calculator,
+            func=_calculate_foraged_flowers_and_foraging_effectiveness,
             args=(
-                foraged_flowers_path_band_list,
-                _SumRasters(), local_foraging_effectiveness_path,
-                gdal.GDT_Float32, _INDEX_NODATA),
-            target_path_list=[
-                local_foraging_effectiveness_path],
+                [scenario_variables['relative_floral_abundance_index_path'][
+                    season] for season in scenario_variables['season_list']],
+                [scenario_variables['species_foraging_activity'][
+                    (species, season)]
+                 for season in scenario_variables['season_list']],
+                foraged_flowers_path_list,
+                local_foraging_effectiveness_path),
+            target_path_list=(
+                foraged_flowers_path_list +
+                [local_foraging_effectiveness_path]),
             dependent_task_list=[
-                foraged_flowers_index_task_map[(species, season)]
+                relative_floral_abudance_task_map[season]
                 for season in scenario_variables['season_list']])
 
         landcover_pixel_size_tuple = landcover_raster_info['pixel_size']
@@ -458,11 +451,15 @@ def execute(args):
             intermediate_output_dir, _KERNEL_FILE_PATTERN % (
                 alpha, file_suffix))
 
-        alpha_kernel_raster_task = task_graph.add_task(
-            task_name='decay_kernel_raster_%s' % alpha,
-            func=utils.exponential_decay_kernel_raster,
-            args=(alpha, kernel_path),
-            target_path_list=[kernel_path])
+        # species whose alphas format to the same kernel path share a kernel
+        # rather than racing to write the same file
+        if kernel_path not in alpha_kernel_raster_task_map:
+            alpha_kernel_raster_task_map[kernel_path] = task_graph.add_task(
+                task_name='decay_kernel_raster_%s' % alpha,
+                func=utils.exponential_decay_kernel_raster,
+                args=(alpha, kernel_path),
+                target_path_list=[kernel_path])
+        alpha_kernel_raster_task = alpha_kernel_raster_task_map[kernel_path]
 
         # convolve FE with alpha_s
         floral_resources_index_path = os.path.join(
@@ -526,32 +523,30 @@ def execute(args):
                 alpha_kernel_raster_task, pollinator_supply_task],
             target_path_list=[convolve_ps_path])
 
+        # calculate pollinator activity as
+        # PA(x,s,j)=RA(l(x),j)fa(s,j) convolve(ps, alpha_s)
+        # for every season at once so FR and convolve(ps) are read only once
         for season in scenario_variables['season_list']:
-            # calculate pollinator activity as
-            # PA(x,s,j)=RA(l(x),j)fa(s,j) convolve(ps, alpha_s)
-            foraged_flowers_index_path = (
-                scenario_variables['foraged_flowers_index_path'][
-                    (species, season)])
-            pollinator_abundance_path = os.path.join(
+            pollinator_abundance_path_map[(species, season)] = os.path.join(
                 output_dir, _POLLINATOR_ABUNDANCE_FILE_PATTERN % (
                     species, season, file_suffix))
+        pollinator_abundance_path_list = [
+            pollinator_abundance_path_map[(species, season)]
+            for season in scenario_variables['season_list']]
+        pollinator_abundance_task = task_graph.add_task(
+            task_name='calculate_poll_abudance_%s' % species,
+            func=_calculate_pollinator_abundance,
+            args=(
+                foraged_flowers_path_list,
+                floral_resources_index_path_map[species], convolve_ps_path,
+                pollinator_abundance_path_list),
+            dependent_task_list=[
+                local_foraging_effectiveness_task,
+                floral_resources_index_task_map[species], convolve_ps_task],
+            target_path_list=pollinator_abundance_path_list)
+        for season in scenario_variables['season_list']:
             pollinator_abundance_task_map[(species, season)] = (
-                task_graph.add_task(
-                    task_name='calculate_poll_abudance_%s' % species,
-                    func=pygeoprocessing.raster_calculator,
-                    args=(
-                        [(foraged_flowers_index_path, 1),
-                         (floral_resources_index_path_map[species], 1),
-                         (convolve_ps_path, 1)],
-                        _PollinatorSupplyOp(), pollinator_abundance_path,
-                        gdal.GDT_Float32, _INDEX_NODATA),
-                    dependent_task_list=[
-                        foraged_flowers_index_task_map[(species, season)],
-                        floral_resources_index_task_map[species],
-                        convolve_ps_task],
-                    target_path_list=[pollinator_abundance_path]))
-            pollinator_abundance_path_map[(species, season)] = (
-                pollinator_abundance_path)
+                pollinator_abundance_task)
 
     # next step is farm vector calculation, if no farms then okay to quit
     if farm_vector_path is None:
@@ -562,40 +557,21 @@ def execute(args):
     # blank raster used for rasterizing all the farm parameters/fields later
     blank_raster_path = os.path.join(
         intermediate_output_dir, _BLANK_RASTER_FILE_PATTERN % file_suffix)
+    # the blank raster is left sparse rather than filled with nodata since
+    # unwritten blocks of a sparse GeoTIFF read back as nodata
     blank_raster_task = task_graph.add_task(
         task_name='create_blank_raster',
         func=pygeoprocessing.new_raster_from_base,
         args=(
             args['landcover_raster_path'], blank_raster_path,
             gdal.GDT_Float32, [_INDEX_NODATA]),
-        kwargs={'fill_value_list': [_INDEX_NODATA]},
+        kwargs={'gtiff_creation_options': _SPARSE_GTIFF_CREATION_OPTIONS},
         target_path_list=[blank_raster_path])
 
     farm_pollinator_season_path_list = []
     farm_pollinator_season_task_list = []
     total_pollinator_abundance_task = {}
     for season in scenario_variables['season_list']:
-        # total_pollinator_abundance_index[season] PAT(x,j)=sum_s PA(x,s,j)
-        total_pollinator_abundance_index_path = os.path.join(
-            output_dir, _TOTAL_POLLINATOR_ABUNDANCE_FILE_PATTERN % (
-                season, file_suffix))
-
-        pollinator_abudnance_season_path_band_list = [
-            (pollinator_abundance_path_map[(species, season)], 1)
-            for species in scenario_variables['species_list']]
-
-        total_pollinator_abundance_task[season] = task_graph.add_task(
-            task_name='calculate_poll_abudnce_%s_%s' % (species, season),
-            func=pygeoprocessing.raster_calculator,
-            args=(
-                pollinator_abudnance_season_path_band_list, _SumRasters(),
-                total_pollinator_abundance_index_path, gdal.GDT_Float32,
-                _INDEX_NODATA),
-            dependent_task_list=[
-                pollinator_abundance_task_map[(species, season)]
-                for species in scenario_variables['species_list']],
-            target_path_list=[total_pollinator_abundance_index_path])
-
         half_saturation_raster_path = os.path.join(
             intermediate_output_dir, _HALF_SATURATION_FILE_PATTERN % (
                 season, file_suffix))
@@ -609,21 +585,34 @@ def execute(args):
             dependent_task_list=[blank_raster_task],
             target_path_list=[half_saturation_raster_path])
 
-        # calc on farm pollinator abundance i.e. FP_season
+        # total_pollinator_abundance_index[season] PAT(x,j)=sum_s PA(x,s,j)
+        # and on farm pollinator abundance i.e. FP_season, calculated
+        # together so PAT isn't read back from disk
+        total_pollinator_abundance_index_path = os.path.join(
+            output_dir, _TOTAL_POLLINATOR_ABUNDANCE_FILE_PATTERN % (
+                season, file_suffix))
         farm_pollinator_season_path = os.path.join(
             intermediate_output_dir, _FARM_POLLINATOR_SEASON_FILE_PATTERN % (
                 season, file_suffix))
-        farm_pollinator_season_task_list.append(task_graph.add_task(
-            task_name='farm_pollinator_%s' % season,
-            func=pygeoprocessing.raster_calculator,
+
+        total_pollinator_abundance_task[season] = task_graph.add_task(
+            task_name='calculate_poll_abudnce_%s' % season,
+            func=_calculate_total_and_farm_pollinator_abundance,
             args=(
-                [(half_saturation_raster_path, 1),
-                 (total_pollinator_abundance_index_path, 1)],
-                _OnFarmPollinatorAbundance(), farm_pollinator_season_path,
-                gdal.GDT_Float32, _INDEX_NODATA),
+                [pollinator_abundance_path_map[(species, season)]
+                 for species in scenario_variables['species_list']],
+                half_saturation_raster_path,
+                total_pollinator_abundance_index_path,
+                farm_pollinator_season_path),
             dependent_task_list=[
-                half_saturation_task, total_pollinator_abundance_task[season]],
-            target_path_list=[farm_pollinator_season_path]))
+                pollinator_abundance_task_map[(species, season)]
+                for species in scenario_variables['species_list']] + [
+                    half_saturation_task],
+            target_path_list=[
+                total_pollinator_abundance_index_path,
+                farm_pollinator_season_path])
+        farm_pollinator_season_task_list.append(
+            total_pollinator_abundance_task[season])
         farm_pollinator_season_path_list.append(farm_pollinator_season_path)
 
     # sum farm pollinators
@@ -787,6 +776,211 @@ def _rasterize_vector_onto_base(
     vector = None
 
 
+def _calculate_foraged_flowers_and_foraging_effectiveness(
+        relative_floral_abundance_path_list, foraging_activity_list,
+        target_foraged_flowers_path_list,
+        target_local_foraging_effectiveness_path):
+    """Calculate RA(l(x),j)*fa(s,j) per season and FE(x,s) in one pass.
+
+    Parameters:
+        relative_floral_abundance_path_list (list): paths to the per season
+            relative floral abundance index rasters RA(l(x), j).
+        foraging_activity_list (list): foraging activity fa(s, j) of the
+            species during the season at the same index in
+            `relative_floral_abundance_path_list`.
+        target_foraged_flowers_path_list (list): paths to the target per
+            season foraged flowers index rasters RA(l(x),j)*fa(s,j).
+        target_local_foraging_effectiveness_path (string): path to target
+            local foraging effectiveness raster
+            FE(x, s) = sum_j [RA(l(x),j) * fa(s,j)], nodata only where every
+            season is nodata.
+
+    Returns:
+        None.
+    """
+    for base_path, target_path in zip(
+            relative_floral_abundance_path_list,
+            target_foraged_flowers_path_list):
+        pygeoprocessing.new_raster_from_base(
+            base_path, target_path, gdal.GDT_Float32, [_INDEX_NODATA])
+    pygeoprocessing.new_raster_from_base(
+        relative_floral_abundance_path_list[0],
+        target_local_foraging_effectiveness_path, gdal.GDT_Float32,
+        [_INDEX_NODATA])
+
+    base_raster_list = [
+        gdal.OpenEx(path, gdal.OF_RASTER)
+        for path in relative_floral_abundance_path_list]
+    base_band_list = [raster.GetRasterBand(1) for raster in base_raster_list]
+    target_raster_list = [
+        gdal.OpenEx(path, gdal.OF_RASTER | gdal.GA_Update)
+        for path in target_foraged_flowers_path_list]
+    target_band_list = [
+        raster.GetRasterBand(1) for raster in target_raster_list]
+    effectiveness_raster = gdal.OpenEx(
+        target_local_foraging_effectiveness_path,
+        gdal.OF_RASTER | gdal.GA_Update)
+    effectiveness_band = effectiveness_raster.GetRasterBand(1)
+
+    for offset_dict in pygeoprocessing.iterblocks(
+            (relative_floral_abundance_path_list[0], 1), offset_only=True):
+        valid_mask = None
+        effectiveness_block = None
+        for base_band, target_band, foraging_activity in zip(
+                base_band_list, target_band_list, foraging_activity_list):
+            floral_abundance_block = base_band.ReadAsArray(**offset_dict)
+            local_valid_mask = floral_abundance_block != _INDEX_NODATA
+            foraged_flowers_block = numpy.empty(
+                floral_abundance_block.shape, dtype=numpy.float32)
+            foraged_flowers_block[:] = _INDEX_NODATA
+            foraged_flowers_block[local_valid_mask] = (
+                floral_abundance_block[local_valid_mask] *
+                numpy.float32(foraging_activity))
+            target_band.WriteArray(
+                foraged_flowers_block, xoff=offset_dict['xoff'],
+                yoff=offset_dict['yoff'])
+
+            if effectiveness_block is None:
+                valid_mask = local_valid_mask
+                effectiveness_block = numpy.zeros(
+                    floral_abundance_block.shape, dtype=numpy.float32)
+            else:
+                valid_mask |= local_valid_mask
+            effectiveness_block[local_valid_mask] += (
+                foraged_flowers_block[local_valid_mask])
+
+        effectiveness_block[~valid_mask] = _INDEX_NODATA
+        effectiveness_band.WriteArray(
+            effectiveness_block, xoff=offset_dict['xoff'],
+            yoff=offset_dict['yoff'])
+
+    effectiveness_band = None
+    effectiveness_raster = None
+    target_band_list = None
+    target_raster_list = None
+    base_band_list = None
+    base_raster_list = None
+
+
+def _calculate_pollinator_abundance(
+        foraged_flowers_path_list, floral_resources_index_path,
+        convolve_ps_path, target_pollinator_abundance_path_list):
+    """Calculate PA(x,s,j) of a species for every season in one pass.
+
+    Parameters:
+        foraged_flowers_path_list (list): paths to the per season foraged
+            flowers index rasters RA(l(x),j)*fa(s,j) of the species.
+        floral_resources_index_path (string): path to the floral resources
+            index raster FR(x,s) of the species.
+        convolve_ps_path (string): path to the pollinator supply of the
+            species convolved over its flight distance.
+        target_pollinator_abundance_path_list (list): paths to the target
+            per season pollinator abundance rasters
+            PA(x,s,j) = RA(l(x),j)*fa(s,j)/FR(x,s) * convolve(PS), in the
+            same order as `foraged_flowers_path_list`.
+
+    Returns:
+        None.
+    """
+    for base_path, target_path in zip(
+            foraged_flowers_path_list,
+            target_pollinator_abundance_path_list):
+        pygeoprocessing.new_raster_from_base(
+            base_path, target_path, gdal.GDT_Float32, [_INDEX_NODATA])
+
+    foraged_flowers_raster_list = [
+        gdal.OpenEx(path, gdal.OF_RASTER)
+        for path in foraged_flowers_path_list]
+    foraged_flowers_band_list = [
+        raster.GetRasterBand(1) for raster in foraged_flowers_raster_list]
+    target_raster_list = [
+        gdal.OpenEx(path, gdal.OF_RASTER | gdal.GA_Update)
+        for path in target_pollinator_abundance_path_list]
+    target_band_list = [
+        raster.GetRasterBand(1) for raster in target_raster_list]
+    convolve_ps_raster = gdal.OpenEx(convolve_ps_path, gdal.OF_RASTER)
+    convolve_ps_band = convolve_ps_raster.GetRasterBand(1)
+
+    pollinator_supply_op = _PollinatorSupplyOp()
+    for offset_dict, floral_resources_block in pygeoprocessing.iterblocks(
+            (floral_resources_index_path, 1)):
+        convolve_ps_block = convolve_ps_band.ReadAsArray(**offset_dict)
+        for foraged_flowers_band, target_band in zip(
+                foraged_flowers_band_list, target_band_list):
+            target_band.WriteArray(
+                pollinator_supply_op(
+                    foraged_flowers_band.ReadAsArray(**offset_dict),
+                    floral_resources_block, convolve_ps_block),
+                xoff=offset_dict['xoff'], yoff=offset_dict['yoff'])
+
+    convolve_ps_band = None
+    convolve_ps_raster = None
+    target_band_list = None
+    target_raster_list = None
+    foraged_flowers_band_list = None
+    foraged_flowers_raster_list = None
+
+
+def _calculate_total_and_farm_pollinator_abundance(
+        pollinator_abundance_path_list, half_saturation_raster_path,
+        target_total_pollinator_abundance_path, target_farm_pollinator_path):
+    """Calculate PAT(x,j) and the on farm pollinator abundance FP(x,j).
+
+    Parameters:
+        pollinator_abundance_path_list (list): paths to the per species
+            pollinator abundance rasters PA(x,s,j) of a season.
+        half_saturation_raster_path (string): path to the rasterized farm
+            half saturation values of the season.
+        target_total_pollinator_abundance_path (string): path to target
+            raster PAT(x,j) = sum_s PA(x,s,j).
+        target_farm_pollinator_path (string): path to target raster
+            FP(x,j) = (PAT * (1 - h)) / (h * (1 - 2*PAT) + PAT).
+
+    Returns:
+        None.
+    """
+    pygeoprocessing.new_raster_from_base(
+        half_saturation_raster_path, target_total_pollinator_abundance_path,
+        gdal.GDT_Float32, [_INDEX_NODATA])
+    pygeoprocessing.new_raster_from_base(
+        half_saturation_raster_path, target_farm_pollinator_path,
+        gdal.GDT_Float32, [_INDEX_NODATA])
+
+    abundance_raster_list = [
+        gdal.OpenEx(path, gdal.OF_RASTER)
+        for path in pollinator_abundance_path_list]
+    abundance_band_list = [
+        raster.GetRasterBand(1) for raster in abundance_raster_list]
+    total_abundance_raster = gdal.OpenEx(
+        target_total_pollinator_abundance_path,
+        gdal.OF_RASTER | gdal.GA_Update)
+    total_abundance_band = total_abundance_raster.GetRasterBand(1)
+    farm_pollinator_raster = gdal.OpenEx(
+        target_farm_pollinator_path, gdal.OF_RASTER | gdal.GA_Update)
+    farm_pollinator_band = farm_pollinator_raster.GetRasterBand(1)
+
+    sum_rasters_op = _SumRasters()
+    on_farm_pollinator_abundance_op = _OnFarmPollinatorAbundance()
+    for offset_dict, half_saturation_block in pygeoprocessing.iterblocks(
+            (half_saturation_raster_path, 1)):
+        total_abundance_block = sum_rasters_op(*[
+            band.ReadAsArray(**offset_dict) for band in abundance_band_list])
+        total_abundance_band.WriteArray(
+            total_abundance_block, xoff=offset_dict['xoff'],
+            yoff=offset_dict['yoff'])
+        farm_pollinator_band.WriteArray(
+            on_farm_pollinator_abundance_op(
+                half_saturation_block, total_abundance_block),
+            xoff=offset_dict['xoff'], yoff=offset_dict['yoff'])
+
+    farm_pollinator_band = None
+    farm_pollinator_raster = None
+    total_abundance_band = None
+    total_abundance_raster = None
+    abundance_band_list = None
+    abundance_raster_list = None
+
+
 def _create_farm_result_vector(
         base_vector_path, target_vector_path):
     """Create a copy of `base_vector_path` and add FID field to it.
@@ -805,39 +999,45 @@ def _create_farm_result_vector(
 
     """
     base_vector = gdal.OpenEx(base_vector_path, gdal.OF_VECTOR)
+    base_layer = base_vector.GetLayer()
+    base_layer_defn = base_layer.GetLayerDefn()
 
+    # build the full schema before writing any features; adding fields to a
+    # shapefile that already has records rewrites its whole .dbf each time
     driver = gdal.GetDriverByName('ESRI Shapefile')
-    target_vector = driver.CreateCopy(
-        target_vector_path, base_vector)
-    target_layer = target_vector.GetLayer()
-
-    farm_pollinator_abundance_defn = ogr.FieldDefn(
-        _POLLINATOR_ABUDNANCE_FARM_FIELD_ID, ogr.OFTReal)
-    farm_pollinator_abundance_defn.SetWidth(25)
-    farm_pollinator_abundance_defn.SetPrecision(11)
-    target_layer.CreateField(farm_pollinator_abundance_defn)
-
-    total_farm_yield_field_defn = ogr.FieldDefn(
-        _TOTAL_FARM_YIELD_FIELD_ID, ogr.OFTReal)
-    total_farm_yield_field_defn.SetWidth(25)
-    total_farm_yield_field_defn.SetPrecision(11)
-    target_layer.CreateField(total_farm_yield_field_defn)
-
-    pol_proportion_farm_yield_field_defn = ogr.FieldDefn(
-        _POLLINATOR_PROPORTION_FARM_YIELD_FIELD_ID, ogr.OFTReal)
-    pol_proportion_farm_yield_field_defn.SetWidth(25)
-    pol_proportion_farm_yield_field_defn.SetPrecision(11)
-    target_layer.CreateField(pol_proportion_farm_yield_field_defn)
-
-    wild_pol_farm_yield_field_defn = ogr.FieldDefn(
-        _WILD_POLLINATOR_FARM_YIELD_FIELD_ID, ogr.OFTReal)
-    wild_pol_farm_yield_field_defn.SetWidth(25)
-    wild_pol_farm_yield_field_defn.SetPrecision(11)
-    target_layer.CreateField(wild_pol_farm_yield_field_defn)
-
+    target_vector = driver.Create(
+        target_vector_path, 0, 0, 0, gdal.GDT_Unknown)
+    target_layer = target_vector.CreateLayer(
+        os.path.splitext(os.path.basename(target_vector_path))[0],
+        base_layer.GetSpatialRef(), base_layer.GetGeomType())
+    for field_index in range(base_layer_defn.GetFieldCount()):
+        target_layer.CreateField(base_layer_defn.GetFieldDefn(field_index))
+
+    for field_id in [
+            _POLLINATOR_ABUDNANCE_FARM_FIELD_ID, _TOTAL_FARM_YIELD_FIELD_ID,
+            _POLLINATOR_PROPORTION_FARM_YIELD_FIELD_ID,
+            _WILD_POLLINATOR_FARM_YIELD_FIELD_ID]:
+        field_defn = ogr.FieldDefn(field_id, ogr.OFTReal)
+        field_defn.SetWidth(25)
+        field_defn.SetPrecision(11)
+        target_layer.CreateField(field_defn)
+
+    # the shapefile driver truncates field names longer than 10 characters,
+    # so copy field values by position rather than by name. The base fields
+    # were created first and in order so they share indexes.
+    field_index_map = list(range(base_layer_defn.GetFieldCount()))
+    target_layer_defn = target_layer.GetLayerDefn()
+    for base_feature in base_layer:
+        target_feature = ogr.Feature(target_layer_defn)
+        target_feature.SetFromWithMap(base_feature, False, field_index_map)
+        target_layer.CreateFeature(target_feature)
+        target_feature = None
+
+    target_layer.SyncToDisk()
     target_layer = None
-    target_vector.FlushCache()
     target_vector = None
+    base_layer = None
+    base_vector = None
 
 
 def _parse_scenario_variables(args):
@@ -876,10 +1076,11 @@ def _parse_scenario_variables(args):
         guild_table_path, 'species', to_lower=True)
 
     LOGGER.info('Checking to make sure guild table has all expected headers')
-    guild_headers = guild_table.itervalues().next().keys()
+    guild_headers = list(next(iter(guild_table.values())))
     for header in _EXPECTED_GUILD_HEADERS:
-        matches = re.findall(header, " ".join(guild_headers))
-        if len(matches) == 0:
+        if not any(
+                re.search(header, guild_header)
+                for guild_header in guild_headers):
             raise ValueError(
                 "Expected a header in guild table that matched the pattern "
                 "'%s' but was unable to find one.  Here are all the headers "
@@ -890,10 +1091,11 @@ def _parse_scenario_variables(args):
     landcover_biophysical_table = utils.build_lookup_from_csv(
         landcover_biophysical_table_path, 'lucode', to_lower=True)
     biophysical_table_headers = (
-        landcover_biophysical_table.itervalues().next().keys())
+        list(next(iter(landcover_biophysical_table.values()))))
     for header in _EXPECTED_BIOPHYSICAL_HEADERS:
-        matches = re.findall(header, " ".join(biophysical_table_headers))
-        if len(matches) == 0:
+        if not any(
+                re.search(header, biophysical_header)
+                for biophysical_header in biophysical_table_headers):
             raise ValueError(
                 "Expected a header in biophysical table that matched the "
                 "pattern '%s' but was unable to find one.  Here are all the "
@@ -930,10 +1132,11 @@ def _parse_scenario_variables(args):
         farm_layer_defn = farm_layer.GetLayerDefn()
         farm_headers = [
             farm_layer_defn.GetFieldDefn(i).GetName()
-            for i in xrange(farm_layer_defn.GetFieldCount())]
+            for i in range(farm_layer_defn.GetFieldCount())]
         for header in _EXPECTED_FARM_HEADERS:
-            matches = re.findall(header, " ".join(farm_headers))
-            if not matches:
+            if not any(
+                    re.search(header, farm_header)
+                    for farm_header in farm_headers):
                 raise ValueError(
                     "Missing an expected headers '%s'from %s.\n"
                     "Got these headers instead %s" % (
@@ -960,7 +1163,7 @@ def _parse_scenario_variables(args):
             substrate_to_header[substrate]['biophysical'] = match.group()
 
     for table_type, lookup_table in itertools.chain(
-            season_to_header.iteritems(), substrate_to_header.iteritems()):
+            season_to_header.items(), substrate_to_header.items()):
         if len(lookup_table) != 3 and farm_vector is not None:
             raise ValueError(
                 "Expected a biophysical, guild, and farm entry for '%s' but "
@@ -1097,8 +1300,8 @@ class _CalculateHabitatNestingIndex(object):
 
         self.species_substrate_suitability_index_array = numpy.array([
             species_substrate_index_map[substrate_id]
-            for substrate_id in sorted(substrate_path_map)]).reshape(
-                (len(species_substrate_index_map), 1))
+            for substrate_id in sorted(substrate_path_map)],
+            dtype=numpy.float32)
 
         self.target_habitat_nesting_index_path = (
             target_habitat_nesting_index_path)
@@ -1107,10 +1310,19 @@ class _CalculateHabitatNestingIndex(object):
         """Calculate HN(x, s) = max_n(N(x, n) ns(s,n))."""
         def max_op(*substrate_index_arrays):
             """Return the max of index_array[n] * ns[n]."""
-            result = numpy.max(
-                numpy.stack([x.flatten() for x in substrate_index_arrays]) *
-                self.species_substrate_suitability_index_array, axis=0)
-            result = result.reshape(substrate_index_arrays[0].shape)
+            # running max with one scratch block rather than materializing
+            # every scaled substrate block at once
+            suitability_array = self.species_substrate_suitability_index_array
+            result = numpy.empty_like(substrate_index_arrays[0])
+            numpy.multiply(
+                substrate_index_arrays[0], suitability_array[0], out=result)
+            scaled_index_array = numpy.empty_like(result)
+            for substrate_index_array, suitability in zip(
+                    substrate_index_arrays[1:], suitability_array[1:]):
+                numpy.multiply(
+                    substrate_index_array, suitability,
+                    out=scaled_index_array)
+                numpy.maximum(result, scaled_index_array, out=result)
             result[substrate_index_arrays[0] == _INDEX_NODATA] = _INDEX_NODATA
             return result
 
@@ -1138,14 +1350,12 @@ class _SumRasters(object):
 
     def __call__(self, *array_list):
         """Calculate sum of array_list and account for nodata."""
-        valid_mask = numpy.zeros(array_list[0].shape, dtype=numpy.bool)
-        result = numpy.empty_like(array_list[0])
-        result[:] = 0
-        for array in array_list:
-            local_valid_mask = array != _INDEX_NODATA
-            result[local_valid_mask] += array[local_valid_mask]
-            valid_mask |= local_valid_mask
-        result[~valid_mask] = _INDEX_NODATA
+        array_stack = numpy.stack(array_list)
+        nodata_stack = array_stack == _INDEX_NODATA
+        array_stack[nodata_stack] = 0
+        result = numpy.add.reduce(array_stack, axis=0)
+        result[numpy.logical_and.reduce(nodata_stack, axis=0)] = (
+            _INDEX_NODATA)
         return result
 
 
@@ -1172,13 +1382,15 @@ class _PollinatorSupplyOp(object):
         valid_mask = foraged_flowers_array != _INDEX_NODATA
         result = numpy.empty_like(foraged_flowers_array)
         result[:] = _INDEX_NODATA
-        zero_mask = floral_resources_array == 0
-        result[zero_mask & valid_mask] = 0.0
-        result_mask = valid_mask & ~zero_mask
-        result[result_mask] = (
-            foraged_flowers_array[result_mask] /
-            floral_resources_array[result_mask] *
-            convolve_ps_array[result_mask])
+        result[valid_mask] = 0.0
+        result_mask = valid_mask & (floral_resources_array != 0)
+        # operate in place on the whole block rather than gathering masked
+        # copies of every input
+        numpy.divide(
+            foraged_flowers_array, floral_resources_array, out=result,
+            where=result_mask)
+        numpy.multiply(
+            result, convolve_ps_array, out=result, where=result_mask)
         return result
 
 
@@ -1195,7 +1407,7 @@ class _PollinatorSupplyIndexOp(object):
         Returns:
             None.
         """
-        self.species_abundance = species_abundance
+        self.species_abundance = numpy.float32(species_abundance)
         # try to get the source code of __call__ so task graph will recompute
         # if the function has changed
         try:
@@ -1215,45 +1427,12 @@ class _PollinatorSupplyIndexOp(object):
         result = numpy.empty_like(floral_resources_array)
         result[:] = _INDEX_NODATA
         valid_mask = floral_resources_array != _INDEX_NODATA
-        result[valid_mask] = (
-            self.species_abundance * floral_resources_array[valid_mask] *
-            habitat_nesting_suitability_array[valid_mask])
-        return result
-
-
-class _MultByScalar(object):
-    """Calculate a raster * scalar.  Mask through nodata."""
-
-    def __init__(self, scalar):
-        """Create a closure for multiplying an array by a scalar.
-
-        Parameters:
-            scalar (float): value to use in `__call__` when multiplying by
-                its parameter.
-
-        Returns:
-            None.
-        """
-        self.scalar = scalar
-        # try to get the source code of __call__ so task graph will recompute
-        # if the function has changed
-        try:
-            self.__name__ = hashlib.sha1(
-                inspect.getsource(
-                    _MultByScalar.__call__
-                )).hexdigest()
-        except IOError:
-            # default to the classname if it doesn't work
-            self.__name__ = (
-                _MultByScalar.__name__)
-        self.__name__ += str(scalar)
-
-    def __call__(self, array):
-        """Return array * self.scalar accounting for nodata."""
-        result = numpy.empty_like(array)
-        result[:] = _INDEX_NODATA
-        valid_mask = array != _INDEX_NODATA
-        result[valid_mask] = array[valid_mask] * self.scalar
+        numpy.multiply(
+            floral_resources_array, self.species_abundance, out=result,
+            where=valid_mask)
+        numpy.multiply(
+            result, habitat_nesting_suitability_array, out=result,
+            where=valid_mask)
         return result
 
 
@@ -1279,11 +1458,16 @@ class _OnFarmPollinatorAbundance(object):
         result[:] = _INDEX_NODATA
 
         valid_mask = (h_array != _INDEX_NODATA) & (pat_array != _INDEX_NODATA)
+        # h is only defined on farms, so most blocks have nothing to compute
+        if not valid_mask.any():
+            return result
 
-        result[valid_mask] = (
-            (pat_array[valid_mask]*(1-h_array[valid_mask])) /
-            (h_array[valid_mask]*(1-2*pat_array[valid_mask]) +
-             pat_array[valid_mask]))
+        numerator = 1 - h_array
+        numerator *= pat_array
+        denominator = 1 - 2 * pat_array
+        denominator *= h_array
+        denominator += pat_array
+        numpy.divide(numerator, denominator, out=result, where=valid_mask)
         return result
 
 
@@ -1308,9 +1492,8 @@ class _PYTOp(object):
         valid_mask = mp_array != _INDEX_NODATA
         result = numpy.empty_like(mp_array)
         result[:] = _INDEX_NODATA
-        result[valid_mask] = mp_array[valid_mask]+FP_array[valid_mask]
-        min_mask = valid_mask & (result > 1.0)
-        result[min_mask] = 1.0
+        numpy.add(mp_array, FP_array, out=result, where=valid_mask)
+        numpy.minimum(result, 1.0, out=result, where=valid_mask)
         return result
 
 
@@ -1335,9 +1518,8 @@ class _PYWOp(object):
         valid_mask = mp_array != _INDEX_NODATA
         result = numpy.empty_like(mp_array)
         result[:] = _INDEX_NODATA
-        result[valid_mask] = PYT_array[valid_mask]-mp_array[valid_mask]
-        max_mask = valid_mask & (result < 0.0)
-        result[max_mask] = 0.0
+        numpy.subtract(PYT_array, mp_array, out=result, where=valid_mask)
+        numpy.maximum(result, 0.0, out=result, where=valid_mask)
         return result
 
 
@@ -1384,14 +1566,17 @@ def validate(args, limit_to=None):
         validation_error_list.append(
             (no_value_list, 'parameter has no value'))
 
+    # validate is called often by the UI, so only stat each path once
+    path_exists_map = {}
     for key in [
             'landcover_raster_path',
             'guild_table_path',
             'landcover_biophysical_table_path']:
-        if (limit_to is None or limit_to == key) and (
-                not os.path.exists(args[key])):
-            validation_error_list.append(
-                ([key], 'not found on disk'))
+        if limit_to is None or limit_to == key:
+            path_exists_map[key] = os.path.exists(args[key])
+            if not path_exists_map[key]:
+                validation_error_list.append(
+                    ([key], 'not found on disk'))
 
     # check that existing/optional files are the correct types
     with utils.capture_gdal_logging():
@@ -1400,7 +1585,9 @@ def validate(args, limit_to=None):
                 ('farm_vector_path', 'vector')]:
             if ((limit_to is None or limit_to == key) and
                     key in args and args[key] != ''):
-                if not os.path.exists(args[key]):
+                if key not in path_exists_map:
+                    path_exists_map[key] = os.path.exists(args[key])
+                if not path_exists_map[key]:
                     validation_error_list.append(
                         ([key], 'not found on disk'))
                     continue
@@ -30,6 +30,16 @@ GDAL_ERROR_LEVELS = {
     gdal.CE_Fatal: logging.CRITICAL,
 }
 
+# largest pixel value that reclassify_raster will map with a dense lookup
+# array instead of pygeoprocessing.reclassify_raster
+_MAX_LOOKUP_TABLE_CODE = 10000
+# GDAL datatypes whose pixel values are integers
+INTEGER_GDAL_TYPES = (
+    gdal.GDT_Byte, gdal.GDT_UInt16, gdal.GDT_Int16, gdal.GDT_UInt32,
+    gdal.GDT_Int32)
+# number of pixels to read at a time when iterating over raster blocks
+LARGEST_ITERBLOCK = 2**20
+
 
 @contextlib.contextmanager
 def capture_gdal_logging():
@@ -522,3 +532,93 @@ def mean_pixel_size_and_area(pixel_size_tuple):
                 pixel_size_tuple))
 
     return (x_size, x_size*y_size)
+
+
+def reclassify_raster(
+        base_raster_path_band, value_map, target_raster_path,
+        target_datatype, target_nodata, values_required=True):
+    """Reclassify a raster, with a dense lookup array where possible.
+
+    Takes the same arguments and behaves like
+    ``pygeoprocessing.reclassify_raster``.  If the base raster is an integer
+    type, the target is Float32 with a nodata value, and every key of
+    `value_map` is an integer in [0, 10000], pixels are mapped with a
+    single ``lookup_array[block]`` gather rather than a per-pixel dictionary
+    lookup.  Otherwise this calls ``pygeoprocessing.reclassify_raster``.
+
+    Parameters:
+        base_raster_path_band (tuple): a (path, band index) tuple of the
+            raster whose pixel values are keys in `value_map`.
+        value_map (dict): maps base raster pixel values to target values.
+        target_raster_path (string): path to the raster to create.
+        target_datatype (int): GDAL datatype of the target raster.
+        target_nodata (float): nodata value of the target raster, or None
+            for no nodata value. Nodata pixels of the base raster are mapped
+            to this value.
+        values_required (boolean): if True, raise a ValueError if a valid
+            base raster pixel value is not in `value_map`, otherwise map
+            such pixels to `target_nodata`.
+
+    Returns:
+        None
+    """
+    base_raster_info = pygeoprocessing.get_raster_info(
+        base_raster_path_band[0])
+    # the lookup array is filled with target_nodata for unmapped codes, so
+    # it needs a nodata value to fill with
+    if (target_datatype != gdal.GDT_Float32 or
+            target_nodata is None or
+            base_raster_info['datatype'] not in INTEGER_GDAL_TYPES or
+            not value_map or
+            # keys are used as array indexes; this is also False for NaN
+            not all(float(key).is_integer() for key in value_map) or
+            min(value_map) < 0 or
+            max(value_map) > _MAX_LOOKUP_TABLE_CODE):
+        pygeoprocessing.reclassify_raster(
+            base_raster_path_band, value_map, target_raster_path,
+            target_datatype, target_nodata, values_required=values_required)
+        return
+
+    base_nodata = base_raster_info['nodata'][base_raster_path_band[1] - 1]
+    lookup_array = numpy.empty(int(max(value_map)) + 1, dtype=numpy.float32)
+    lookup_array[:] = target_nodata
+    is_mapped_array = numpy.zeros(lookup_array.shape, dtype=numpy.bool)
+    for key, value in value_map.items():
+        lookup_array[int(key)] = value
+        is_mapped_array[int(key)] = True
+
+    pygeoprocessing.new_raster_from_base(
+        base_raster_path_band[0], target_raster_path, gdal.GDT_Float32,
+        [target_nodata])
+    target_raster = gdal.OpenEx(
+        target_raster_path, gdal.OF_RASTER | gdal.GA_Update)
+    target_band = target_raster.GetRasterBand(1)
+    for offset_dict, key_block in pygeoprocessing.iterblocks(
+            base_raster_path_band, largest_block=LARGEST_ITERBLOCK):
+        if base_nodata is not None:
+            valid_mask = key_block != base_nodata
+        else:
+            valid_mask = numpy.ones(key_block.shape, dtype=numpy.bool)
+        in_table_mask = (
+            valid_mask & (key_block >= 0) &
+            (key_block < lookup_array.size))
+        in_table_mask[in_table_mask] = is_mapped_array[
+            key_block[in_table_mask]]
+        if values_required:
+            unmapped_mask = valid_mask & ~in_table_mask
+            if unmapped_mask.any():
+                raise ValueError(
+                    'The following raster values %s from "%s" do not have '
+                    'corresponding entries in the value map.' % (
+                        numpy.unique(key_block[unmapped_mask]),
+                        base_raster_path_band[0]))
+
+        target_block = numpy.empty(key_block.shape, dtype=numpy.float32)
+        target_block[:] = target_nodata
+        target_block[in_table_mask] = lookup_array[key_block[in_table_mask]]
+        target_band.WriteArray(
+            target_block, xoff=offset_dict['xoff'],
+            yoff=offset_dict['yoff'])
+
+    target_band = None
+    target_raster = None
@@ -206,6 +206,101 @@ class ForestCarbonEdgeTests(unittest.TestCase):
         actual_message = str(cm.exception)
         self.assertTrue(expected_message in actual_message, actual_message)
 
+    def test_edge_carbon_block_query(self):
+        """Forest Carbon Edge: block query matches the per pixel query."""
+        from natcap.invest import forest_carbon_edge_effect
+        from osgeo import osr
+        import pickle
+        import scipy.spatial
+
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(26910)  # UTM Zone 10N
+        origin_x, origin_y = 461261.0, 4923265.0
+        n_rows, n_cols = 20, 30  # 100m pixels, well under a 10km diagonal
+        gtiff_driver = gdal.GetDriverByName('GTiff')
+
+        def _make_raster(path, array, datatype, nodata):
+            raster = gtiff_driver.Create(
+                path, n_cols, n_rows, 1, datatype)
+            raster.SetProjection(srs.ExportToWkt())
+            raster.SetGeoTransform(
+                [origin_x, 100.0, 0.0, origin_y, 0.0, -100.0])
+            band = raster.GetRasterBand(1)
+            band.SetNoDataValue(nodata)
+            band.WriteArray(array)
+            band = None
+            raster = None
+
+        edge_distance_path = os.path.join(self.workspace_dir, 'edge.tif')
+        edge_distance_array = numpy.fromfunction(
+            lambda row, col: 1.0 + numpy.minimum(row, col),
+            (n_rows, n_cols), dtype=numpy.float32)
+        _make_raster(
+            edge_distance_path, edge_distance_array, gdal.GDT_Float32, -1)
+
+        non_forest_mask_path = os.path.join(self.workspace_dir, 'mask.tif')
+        non_forest_mask_array = numpy.zeros((n_rows, n_cols), numpy.uint8)
+        non_forest_mask_array[0, :] = 1
+        non_forest_mask_array[5, 5] = 255
+        _make_raster(
+            non_forest_mask_path, non_forest_mask_array, gdal.GDT_Byte, 255)
+
+        # model points 10-40km away so all pixels share the same 3 nearest
+        # points, but at distances that vary across the raster
+        center_y = origin_y - n_rows * 50.0
+        center_x = origin_x + n_cols * 50.0
+        kd_points = [
+            [center_y + offset_y, center_x + offset_x]
+            for offset_y, offset_x in [
+                (10e3, 0), (0, 15e3), (-20e3, -5e3), (30e3, 10e3),
+                (-35e3, 0), (0, -40e3)]]
+        theta_model_parameters = (
+            numpy.array([100, 80, 120, 90, 60, 110], dtype=numpy.float32),
+            numpy.array([20, 10, 30, 15, 5, 25], dtype=numpy.float32),
+            numpy.array([0.5, 1.0, 0.2, 0.7, 0.1, 0.3], dtype=numpy.float32))
+        method_model_parameter = numpy.array(
+            [1, 2, 3, 1, 2, 3], dtype=numpy.int32)
+        spatial_index_pickle_path = os.path.join(
+            self.workspace_dir, 'spatial_index.pickle')
+        with open(spatial_index_pickle_path, 'wb') as picklefile:
+            picklefile.write(pickle.dumps((
+                scipy.spatial.cKDTree(kd_points), theta_model_parameters,
+                method_model_parameter)))
+
+        from natcap.invest.forest_carbon_edge_effect import (
+            _calculate_tropical_forest_edge_carbon_map)
+
+        def _calculate_carbon(target_path):
+            _calculate_tropical_forest_edge_carbon_map(
+                edge_distance_path, non_forest_mask_path,
+                spatial_index_pickle_path, 3, 0.47, target_path, -1)
+            raster = gdal.OpenEx(target_path, gdal.OF_RASTER)
+            array = raster.ReadAsArray()
+            raster = None
+            return array
+
+        block_carbon_array = _calculate_carbon(
+            os.path.join(self.workspace_dir, 'block.tif'))
+
+        # a 0 diagonal forces a nearest point query for every pixel
+        max_diagonal = forest_carbon_edge_effect.BLOCK_QUERY_MAX_DIAGONAL
+        forest_carbon_edge_effect.BLOCK_QUERY_MAX_DIAGONAL = 0
+        try:
+            pixel_carbon_array = _calculate_carbon(
+                os.path.join(self.workspace_dir, 'pixel.tif'))
+        finally:
+            forest_carbon_edge_effect.BLOCK_QUERY_MAX_DIAGONAL = max_diagonal
+
+        # pixels with the same edge distance still differ by their distance
+        # to the model points
+        self.assertNotAlmostEqual(
+            block_carbon_array[19, 10], block_carbon_array[10, 19], places=3)
+        numpy.testing.assert_allclose(
+            block_carbon_array, pixel_carbon_array, rtol=1e-6)
+        self.assertTrue(numpy.all(
+            block_carbon_array[non_forest_mask_array != 0] ==
+            forest_carbon_edge_effect.CARBON_MAP_NODATA))
+
     @staticmethod
     def _test_same_files(base_list_path, directory_path):
         """Assert files in `base_list_path` are in `directory_path`.
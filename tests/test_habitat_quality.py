@@ -220,6 +220,77 @@ def assert_array_sum(base_raster_path, desired_sum):
     numpy.testing.assert_almost_equal(raster_sum, desired_sum)
 
 
+def assert_convolution_matches(
+        workspace_dir, signal_array, kernel_array, convolve_func):
+    """Assert a convolution function matches pygeoprocessing.convolve_2d.
+
+    Parameters:
+        workspace_dir (str): directory to write the rasters to.
+        signal_array (numpy.ndarray): the signal, -1 is nodata.
+        kernel_array (numpy.ndarray): the kernel.
+        convolve_func (function): function taking signal, kernel and target
+            raster paths, in that order.
+
+    Returns:
+        None.
+
+    """
+    signal_path = os.path.join(workspace_dir, 'signal.tif')
+    make_raster_from_array(signal_array, signal_path)
+    kernel_path = os.path.join(workspace_dir, 'kernel.tif')
+    make_raster_from_array(kernel_array, kernel_path)
+
+    expected_path = os.path.join(workspace_dir, 'expected.tif')
+    pygeoprocessing.convolve_2d(
+        (signal_path, 1), (kernel_path, 1), expected_path)
+    actual_path = os.path.join(workspace_dir, 'actual.tif')
+    convolve_func(signal_path, kernel_path, actual_path)
+
+    expected_info = pygeoprocessing.get_raster_info(expected_path)
+    actual_info = pygeoprocessing.get_raster_info(actual_path)
+    for key in ['raster_size', 'datatype', 'nodata', 'geotransform']:
+        numpy.testing.assert_equal(actual_info[key], expected_info[key])
+
+    expected_raster = gdal.OpenEx(expected_path, gdal.OF_RASTER)
+    expected_array = expected_raster.ReadAsArray()
+    expected_raster = None
+    actual_raster = gdal.OpenEx(actual_path, gdal.OF_RASTER)
+    actual_array = actual_raster.ReadAsArray()
+    actual_raster = None
+    numpy.testing.assert_allclose(
+        actual_array, expected_array, rtol=1e-6, atol=1e-6)
+
+
+def make_tiled_raster(base_array, base_raster_path, datatype, nodata):
+    """Make a raster with 16x16 pixel tiles from an array.
+
+    Parameters:
+        base_array (numpy.ndarray): the 2D array for making the raster.
+        base_raster_path (str): the path for the raster to be created.
+        datatype (int): GDAL datatype of the raster.
+        nodata (number): nodata value of the raster, or None for no nodata
+            value.
+
+    Returns:
+        None.
+
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(26910)  # UTM Zone 10N
+    driver = gdal.GetDriverByName('GTiff')
+    raster = driver.Create(
+        base_raster_path, base_array.shape[1], base_array.shape[0], 1,
+        datatype, options=['TILED=YES', 'BLOCKXSIZE=16', 'BLOCKYSIZE=16'])
+    raster.SetProjection(srs.ExportToWkt())
+    raster.SetGeoTransform([1180000, 1.0, 0.0, 690000, 0.0, -1.0])
+    band = raster.GetRasterBand(1)
+    if nodata is not None:
+        band.SetNoDataValue(nodata)
+    band.WriteArray(base_array)
+    band = None
+    raster = None
+
+
 class HabitatQualityTests(unittest.TestCase):
     """Tests for the Habitat Quality model."""
 
@@ -555,3 +626,144 @@ class HabitatQualityTests(unittest.TestCase):
             self.assertTrue(
                 ([key], 'should have a value') in validation_error_list,
                 'exception not raised for %s')
+
+    def test_data_bounding_box(self):
+        """Habitat Quality: bounding box of a raster's valid pixels."""
+        from natcap.invest import habitat_quality
+
+        signal_array = numpy.full((30, 40), -1, dtype=numpy.float32)
+        signal_array[10:19, 12:26] = 0
+        signal_array[12, 14] = 1
+        signal_path = os.path.join(self.workspace_dir, 'signal.tif')
+        make_raster_from_array(signal_array, signal_path)
+        self.assertEqual(
+            habitat_quality._data_bounding_box(signal_path), (12, 10, 14, 9))
+
+        signal_array[:] = -1
+        make_raster_from_array(signal_array, signal_path)
+        self.assertEqual(habitat_quality._data_bounding_box(signal_path), None)
+
+    def test_convolve_2d_data_extent(self):
+        """Habitat Quality: convolving the data window matches convolve_2d."""
+        from natcap.invest import habitat_quality
+
+        kernel_array = numpy.random.RandomState(1).uniform(
+            0.1, 1.0, (5, 5)).astype(numpy.float32)
+
+        # valid pixels surrounded by a nodata border
+        signal_array = numpy.full((30, 40), -1, dtype=numpy.float32)
+        signal_array[10:19, 12:26] = numpy.random.RandomState(2).randint(
+            0, 2, (9, 14))
+        signal_array[14, 20] = -1  # nodata inside the data window
+        assert_convolution_matches(
+            self.workspace_dir, signal_array, kernel_array,
+            habitat_quality._convolve_2d_data_extent)
+
+        # valid pixels touching the raster edges
+        signal_array = numpy.full((30, 40), -1, dtype=numpy.float32)
+        signal_array[0:6, 30:40] = 1
+        assert_convolution_matches(
+            self.workspace_dir, signal_array, kernel_array,
+            habitat_quality._convolve_2d_data_extent)
+
+        # a kernel larger than the raster, so the padding is clipped to
+        # the raster on every side
+        large_kernel_array = numpy.random.RandomState(3).uniform(
+            0.1, 1.0, (15, 17)).astype(numpy.float32)
+        signal_array = numpy.full((10, 12), -1, dtype=numpy.float32)
+        signal_array[4:6, 5:8] = 1
+        assert_convolution_matches(
+            self.workspace_dir, signal_array, large_kernel_array,
+            habitat_quality._convolve_2d_data_extent)
+
+        # no valid pixels at all
+        signal_array = numpy.full((30, 40), -1, dtype=numpy.float32)
+        assert_convolution_matches(
+            self.workspace_dir, signal_array, kernel_array,
+            habitat_quality._convolve_2d_data_extent)
+
+    def test_direct_convolve_2d(self):
+        """Habitat Quality: direct convolution matches convolve_2d."""
+        from natcap.invest import habitat_quality
+
+        # an asymmetric 7x5 kernel (35 pixels) is convolved directly
+        kernel_array = numpy.random.RandomState(4).uniform(
+            0.1, 1.0, (7, 5)).astype(numpy.float32)
+        n_rows, n_cols = 20, 15
+        signal_array = numpy.random.RandomState(5).randint(
+            0, 2, (n_rows, n_cols)).astype(numpy.float32)
+        # nodata on the last and first rows of neighboring 3 row strips
+        signal_array[2, 4:9] = -1
+        signal_array[3, 0:3] = -1
+        signal_array[9, :] = -1
+        signal_array[n_rows - 1, n_cols - 1] = -1
+
+        # 3 rows per strip, fewer than the kernel's 3 row radius plus one,
+        # so every strip reads rows from the strips on either side
+        strip_pixels = habitat_quality._DIRECT_CONVOLUTION_STRIP_PIXELS
+        habitat_quality._DIRECT_CONVOLUTION_STRIP_PIXELS = 3 * n_cols
+        try:
+            assert_convolution_matches(
+                self.workspace_dir, signal_array, kernel_array,
+                habitat_quality._direct_convolve_2d)
+            # _convolve_2d dispatches this kernel to the direct path
+            assert_convolution_matches(
+                self.workspace_dir, signal_array, kernel_array,
+                habitat_quality._convolve_2d)
+        finally:
+            habitat_quality._DIRECT_CONVOLUTION_STRIP_PIXELS = strip_pixels
+
+    def test_raster_pixel_count(self):
+        """Habitat Quality: raster_pixel_count matches numpy.unique."""
+        from natcap.invest import habitat_quality
+        from natcap.invest import utils
+
+        large_value = habitat_quality._MAX_BINCOUNT_VALUE + 3
+        random_state = numpy.random.RandomState(6)
+        # 40x40 pixels is a 3x3 grid of 16x16 pixel blocks
+        int_array = random_state.randint(0, 10, (40, 40))
+        # negative and large codes in some blocks only, so that bincount
+        # and unique blocks are mixed in one raster
+        int_array[0, 0:3] = -5
+        int_array[20, 20] = large_value
+        int_array[39, 39] = 2 * large_value
+
+        float_array = random_state.randint(0, 4, (40, 40)) * 0.5 - 0.25
+        float_array[35:40, 0:10] = -1.5
+
+        # (array, datatype, nodata)
+        test_cases = [
+            # nodata inside the bincount range is binned then dropped
+            (int_array.clip(0, 9), gdal.GDT_Byte, 9),
+            (int_array, gdal.GDT_Int32, 7),
+            # negative, large and missing nodata values are masked
+            (int_array, gdal.GDT_Int32, -5),
+            (int_array, gdal.GDT_Int32, large_value),
+            (int_array, gdal.GDT_Int32, None),
+            # non-integer values are counted with numpy.unique
+            (float_array, gdal.GDT_Float32, -1.5),
+            (float_array, gdal.GDT_Float32, None)]
+
+        raster_path = os.path.join(self.workspace_dir, 'count.tif')
+        largest_iterblock = utils.LARGEST_ITERBLOCK
+        utils.LARGEST_ITERBLOCK = 16 * 16
+        try:
+            for base_array, datatype, nodata in test_cases:
+                make_tiled_raster(base_array, raster_path, datatype, nodata)
+                raster = gdal.OpenEx(raster_path, gdal.OF_RASTER)
+                raster_array = raster.GetRasterBand(1).ReadAsArray()
+                raster = None
+
+                # the counts of the original numpy.unique implementation
+                expected_counts = {}
+                for value, count in zip(
+                        *numpy.unique(raster_array, return_counts=True)):
+                    if value != nodata:
+                        expected_counts[value] = count
+
+                self.assertEqual(
+                    habitat_quality.raster_pixel_count(raster_path),
+                    expected_counts)
+                os.remove(raster_path)
+        finally:
+            utils.LARGEST_ITERBLOCK = largest_iterblock
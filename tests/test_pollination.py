@@ -287,6 +287,39 @@ class PollinationTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             pollination.execute(args)
 
+    def test_create_farm_result_vector_long_field_names(self):
+        """Pollination: farm fields with long names keep their values."""
+        from natcap.invest import pollination
+
+        farm_vector_path = os.path.join(self.workspace_dir, 'farm.gpkg')
+        pygeoprocessing.testing.create_vector_on_disk(
+            [shapely.geometry.Point(20, -20).buffer(5)],
+            sampledata.SRS_WILLAMETTE.projection,
+            {'crop_type': 'string', 'a_long_field_name': 'real'},
+            [{'crop_type': 'test', 'a_long_field_name': 0.25}],
+            vector_format='GPKG', filename=farm_vector_path)
+
+        result_vector_path = os.path.join(self.workspace_dir, 'result.shp')
+        pollination._create_farm_result_vector(
+            farm_vector_path, result_vector_path)
+
+        result_vector = ogr.Open(result_vector_path)
+        result_layer = result_vector.GetLayer()
+        try:
+            result_feature = result_layer.GetNextFeature()
+            self.assertEqual(result_feature.GetField('crop_type'), 'test')
+            # the shapefile truncates the name to 10 characters but the
+            # value is kept
+            self.assertAlmostEqual(
+                result_feature.GetField('a_long_fie'), 0.25)
+            for field_id in ['p_abund', 'y_tot', 'pdep_y_w', 'y_wild']:
+                self.assertTrue(
+                    result_layer.GetLayerDefn().GetFieldIndex(field_id) >= 0)
+        finally:
+            result_feature = None
+            result_layer = None
+            result_vector = None
+
     def test_pollination_unequal_raster_pixel_size(self):
         """Pollination: regression testing sample data."""
         from natcap.invest import pollination
@@ -618,3 +618,162 @@ class BuildLookupFromCSVTests(unittest.TestCase):
         self.assertEqual(lookup_dict[4]['header 2'], 5)
         self.assertEqual(lookup_dict[4]['header 3'], 'foo')
         self.assertEqual(lookup_dict[1]['header 1'], 1)
+
+
+class ReclassifyRasterTests(unittest.TestCase):
+    """Tests for natcap.invest.utils.reclassify_raster."""
+
+    def setUp(self):
+        """Make temporary directory for workspace."""
+        self.workspace_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Delete workspace."""
+        shutil.rmtree(self.workspace_dir)
+
+    def _make_landcover_raster(self, array, nodata):
+        """Write `array` to an Int32 raster in the workspace.
+
+        Parameters:
+            array (numpy.ndarray): 2D array of landcover codes.
+            nodata (int): nodata value of the raster, or None for no
+                nodata value.
+
+        Returns:
+            path to the new raster.
+        """
+        from osgeo import osr
+
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(26910)  # UTM Zone 10N
+        raster_path = os.path.join(self.workspace_dir, 'lulc.tif')
+        driver = gdal.GetDriverByName('GTiff')
+        raster = driver.Create(
+            raster_path, array.shape[1], array.shape[0], 1, gdal.GDT_Int32)
+        raster.SetProjection(srs.ExportToWkt())
+        raster.SetGeoTransform([461261, 1.0, 0.0, 4923265, 0.0, -1.0])
+        band = raster.GetRasterBand(1)
+        if nodata is not None:
+            band.SetNoDataValue(nodata)
+        band.WriteArray(array)
+        band = None
+        raster = None
+        return raster_path
+
+    def test_reclassify_raster_lookup_table(self):
+        """utils: test reclassify_raster on an integer raster."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array([[1, 2, 3], [3, 255, 1]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, 255)
+        target_path = os.path.join(self.workspace_dir, 'target.tif')
+        utils.reclassify_raster(
+            (lulc_path, 1), {1: 0.5, 2: 0.25, 3: 1.0}, target_path,
+            gdal.GDT_Float32, -1.0)
+
+        target_raster = gdal.OpenEx(target_path, gdal.OF_RASTER)
+        target_band = target_raster.GetRasterBand(1)
+        self.assertEqual(target_band.GetNoDataValue(), -1.0)
+        numpy.testing.assert_allclose(
+            target_band.ReadAsArray(),
+            [[0.5, 0.25, 1.0], [1.0, -1.0, 0.5]])
+        target_band = None
+        target_raster = None
+
+    def test_reclassify_raster_missing_value(self):
+        """utils: test reclassify_raster raises on an unmapped value."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array([[1, 2], [4, 255]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, 255)
+        target_path = os.path.join(self.workspace_dir, 'target.tif')
+        with self.assertRaises(ValueError):
+            utils.reclassify_raster(
+                (lulc_path, 1), {1: 0.5, 2: 0.25}, target_path,
+                gdal.GDT_Float32, -1.0)
+
+    def test_reclassify_raster_nodata_passthrough(self):
+        """utils: test reclassify_raster maps nodata and unmapped values."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array([[1, 2], [4, 255]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, 255)
+        target_path = os.path.join(self.workspace_dir, 'target.tif')
+        utils.reclassify_raster(
+            (lulc_path, 1), {1: 0.5, 2: 0.25}, target_path,
+            gdal.GDT_Float32, -1.0, values_required=False)
+
+        target_raster = gdal.OpenEx(target_path, gdal.OF_RASTER)
+        target_band = target_raster.GetRasterBand(1)
+        self.assertEqual(target_band.GetNoDataValue(), -1.0)
+        numpy.testing.assert_allclose(
+            target_band.ReadAsArray(), [[0.5, 0.25], [-1.0, -1.0]])
+        target_band = None
+        target_raster = None
+
+    def test_reclassify_raster_pygeoprocessing_fallback(self):
+        """utils: test reclassify_raster outside the lookup table case."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array(
+            [[1, 2, 20000], [20000, 255, 1]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, 255)
+
+        # an Int32 target and a key too large for the lookup table
+        for target_datatype, value_map, expected_array in [
+                (gdal.GDT_Int32, {1: 5, 2: 6, 20000: 7},
+                 [[5, 6, 7], [7, -1, 5]]),
+                (gdal.GDT_Float32, {1: 0.5, 2: 0.25, 20000: 1.0},
+                 [[0.5, 0.25, 1.0], [1.0, -1.0, 0.5]])]:
+            target_path = os.path.join(self.workspace_dir, 'target.tif')
+            utils.reclassify_raster(
+                (lulc_path, 1), value_map, target_path, target_datatype,
+                -1)
+
+            target_raster = gdal.OpenEx(target_path, gdal.OF_RASTER)
+            target_band = target_raster.GetRasterBand(1)
+            self.assertEqual(target_band.DataType, target_datatype)
+            self.assertEqual(target_band.GetNoDataValue(), -1)
+            numpy.testing.assert_allclose(
+                target_band.ReadAsArray(), expected_array)
+            target_band = None
+            target_raster = None
+            os.remove(target_path)
+
+    def test_reclassify_raster_float_key(self):
+        """utils: test reclassify_raster with a non-integer key."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array([[1, 2], [2, 255]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, 255)
+        target_path = os.path.join(self.workspace_dir, 'target.tif')
+        # pixel value 1 is not mapped by the 1.5 key
+        with self.assertRaises(ValueError):
+            utils.reclassify_raster(
+                (lulc_path, 1), {1.5: 0.5, 2: 0.25}, target_path,
+                gdal.GDT_Float32, -1.0)
+
+    def test_reclassify_raster_no_target_nodata(self):
+        """utils: test reclassify_raster with a target nodata of None."""
+        from natcap.invest import utils
+        import numpy
+
+        lulc_array = numpy.array([[1, 2, 3], [3, 2, 1]], dtype=numpy.int32)
+        lulc_path = self._make_landcover_raster(lulc_array, None)
+        target_path = os.path.join(self.workspace_dir, 'target.tif')
+        utils.reclassify_raster(
+            (lulc_path, 1), {1: 0.5, 2: 0.25, 3: 1.0}, target_path,
+            gdal.GDT_Float32, None)
+
+        target_raster = gdal.OpenEx(target_path, gdal.OF_RASTER)
+        target_band = target_raster.GetRasterBand(1)
+        self.assertEqual(target_band.GetNoDataValue(), None)
+        numpy.testing.assert_allclose(
+            target_band.ReadAsArray(), [[0.5, 0.25, 1.0], [1.0, 0.25, 0.5]])
+        target_band = None
+        target_raster = None